@@ -1,20 +1,6 @@
 import streamlit as st
-import pandas as pd
-import sys
-
-st.write(sys.version)
-# Importando as funções dos nossos módulos refatorados
-from data_handler import (
-    carregar_arquivos_csv, 
-    init_supabase_client, 
-    buscar_restricoes, 
-    converter_df_para_csv
-)
-from ui_components import (
-    exibir_sidebar, 
-    exibir_configuracoes_banco
-)
-from filters import aplicar_filtros
+from config import POLITICAS_DEDUPLICACAO, MARGEM_DEDUPLICACAO
+from arquivos_servidor import diretorio_configurado, selecionar_arquivos
 
 # --- 1. Configuração da Página e Título ---
 st.set_page_config(
@@ -26,23 +12,85 @@ st.title("🚀 Filtrador de Campanhas Otimizado")
 
 # --- 2. Upload de Arquivos ---
 st.sidebar.header("1. Carregue os arquivos de higienização")
-arquivos_carregados = st.sidebar.file_uploader(
-    'Arraste um ou mais arquivos CSV aqui',
-    accept_multiple_files=True,
-    type=['csv'],
-    key='file_uploader'
+# Arquivos grandes podem ser lidos direto de uma pasta do servidor, sem upload
+origem_arquivos = "Upload"
+if diretorio_configurado():
+    origem_arquivos = st.sidebar.radio(
+        "Origem dos arquivos:", ["Upload", "Pasta do servidor"], horizontal=True, key='origem_arquivos'
+    )
+if origem_arquivos == "Pasta do servidor":
+    arquivos_carregados = selecionar_arquivos('campanha')
+else:
+    arquivos_carregados = st.sidebar.file_uploader(
+        'Arraste um ou mais arquivos CSV aqui',
+        accept_multiple_files=True,
+        type=['csv'],
+        key='file_uploader'
+    )
+politica_deduplicacao = st.sidebar.selectbox(
+    "Registros repetidos (CPF e Matrícula) entre arquivos:",
+    list(POLITICAS_DEDUPLICACAO),
+    key='politica_deduplicacao'
 )
 st.sidebar.write("---")
 
+# Os módulos de dados (pandas, Arrow, filtros, Supabase) só são carregados quando há
+# uma base para processar; a primeira renderização da página depende só do Streamlit.
+if arquivos_carregados or 'df_bruto' in st.session_state:
+    import pandas as pd
+    from data_handler import (
+        carregar_dataset, 
+        colunas_necessarias,
+        detectar_convenio,
+        obter_perfil,
+        init_supabase_client, 
+        iniciar_busca_restricoes,
+        buscar_restricoes, 
+        converter_df_para_csv
+    )
+    from ui_components import (
+        exibir_sidebar, 
+        exibir_configuracoes_banco,
+        exibir_resultado_paginado
+    )
+    from cache_resultados import aplicar_filtros_com_cache, chave_contexto
+    from perfil_dataset import resumo_perfil
+    from particionamento import escrever_particoes
+
 if arquivos_carregados:
-    st.session_state.df_bruto = carregar_arquivos_csv(arquivos_carregados)
+    tipo_campanha_atual = st.session_state.get('tipo_campanha_selectbox', 'Novo')
+    convenio_arquivo = detectar_convenio(arquivos_carregados)
+
+    # As restrições são buscadas em segundo plano enquanto os arquivos são lidos
+    iniciar_busca_restricoes(init_supabase_client(), convenio_arquivo, tipo_campanha_atual)
+
+    # Lê apenas as colunas exigidas pelas campanhas do convênio do arquivo (qualquer tipo)
+    colunas_campanha = colunas_necessarias(convenio_arquivo)
+    # A base fica no registro do processo; a sessão guarda apenas a referência
+    deduplicacao = POLITICAS_DEDUPLICACAO[politica_deduplicacao]
+    chave_dataset, st.session_state.df_bruto = carregar_dataset(
+        arquivos_carregados,
+        colunas_campanha,
+        deduplicacao=deduplicacao,
+        coluna_margem=MARGEM_DEDUPLICACAO.get(tipo_campanha_atual) if deduplicacao == 'maior_margem' else None
+    )
+    st.session_state.perfil = obter_perfil(chave_dataset, st.session_state.df_bruto)
 
 # --- 3. Lógica Principal da Aplicação ---
 if 'df_bruto' in st.session_state and not st.session_state.df_bruto.empty:
     df_bruto = st.session_state.df_bruto
+    perfil = st.session_state.get('perfil')
     
     st.success(f"Arquivos carregados com sucesso! Total de {len(df_bruto)} registros.")
+    relatorio_deduplicacao = df_bruto.attrs.get('deduplicacao')
+    if relatorio_deduplicacao:
+        removidos = sum(r['removidos'] for r in relatorio_deduplicacao.values())
+        st.info(f"Deduplicação ({politica_deduplicacao}): {removidos} registros repetidos removidos.")
+        st.dataframe(pd.DataFrame.from_dict(relatorio_deduplicacao, orient='index'))
     st.dataframe(df_bruto.head(3))
+    if perfil:
+        with st.expander("📊 Perfil da base (nulos e margens)"):
+            st.dataframe(resumo_perfil(perfil))
     st.write("---")
 
     # Inicializa o cliente do Supabase
@@ -61,120 +109,125 @@ if 'df_bruto' in st.session_state and not st.session_state.df_bruto.empty:
     else:
         restricoes_db = {}
     
-    params_gerais = exibir_sidebar(df_bruto, restricoes_db)
+    params_gerais = exibir_sidebar(df_bruto, restricoes_db, perfil)
     
     # --- Configuração dos Bancos (Área Principal) ---
     configs_banco = exibir_configuracoes_banco(
         params_gerais['tipo_campanha'],
         params_gerais['convenio'],
-        df_bruto
+        df_bruto,
+        perfil
+    )
+
+    # Base e parâmetros que produziriam o resultado agora; um resultado de outra origem está desatualizado
+    origem_resultado = (
+        st.session_state.get('dataset_chave'),
+        chave_contexto(params_gerais, configs_banco, restricoes_db)
     )
 
     # --- Ação Principal: Aplicar Filtros ---
     st.header("3. Gere a Campanha")
-    if st.button("✨ Aplicar Filtros e Gerar Arquivo", type="primary", use_container_width=True):
+    # Porcentagens acima de 100% deixariam as últimas equipes sem clientes
+    percentual_equipes = params_gerais['convai_percent'] + sum(params_gerais['equipes_adicionais'].values())
+    if st.button("✨ Aplicar Filtros e Gerar Arquivo", type="primary", use_container_width=True,
+                 disabled=percentual_equipes > 100):
         with st.spinner("Processando e aplicando filtros... Este processo pode levar alguns segundos."):
             try:
-                base_filtrada = aplicar_filtros(
+                base_filtrada = aplicar_filtros_com_cache(
                     df_bruto, 
                     params_gerais, 
-                    configs_banco
+                    configs_banco,
+                    restricoes_db,
+                    impressao=st.session_state.get('dataset_chave')
                 )
 
+                # =====================================================
+                # DOWNLOADS (gerados uma vez; reaproveitados na paginação)
+                # =====================================================
+                downloads = []
                 if not base_filtrada.empty:
-                    # --- LOGS DE VALIDAÇÃO ---
-                    with st.expander("🔬 Parâmetros de Validação Utilizados no Filtro"):
-                        st.subheader("Parâmetros Gerais")
-                        st.json(params_gerais)
-
-                        st.subheader("Restrições Carregadas do Supabase")
-                        st.json(restricoes_db or {})
-
-                        st.subheader("Configurações de Banco e Produto")
-                        st.json(configs_banco)
-
-                    st.success("Filtros aplicados com sucesso!")
-                    st.metric(
-                        "Registros na campanha final:", 
-                        f"{len(base_filtrada)} clientes"
-                    )
-                    st.dataframe(base_filtrada.head())
-
-                    # =====================================================
-                    # DOWNLOADS
-                    # =====================================================
                     eh_campanha_novo = params_gerais['tipo_campanha'] == 'Novo'
                     data_hoje = pd.Timestamp.now().strftime('%Y%m%d')
-
-                    st.subheader("📥 Downloads da Campanha")
+                    convenio = params_gerais['convenio']
 
                     # Arquivo completo (sempre disponível)
                     csv_completo = converter_df_para_csv(base_filtrada)
+                    nome_completo = (
+                        f"{convenio}_novo_completo_{data_hoje}.csv" if eh_campanha_novo
+                        else f"{convenio}_{params_gerais['tipo_campanha']}_{data_hoje}.csv"
+                    )
+                    downloads.append(("📄 Arquivo Completo", csv_completo, nome_completo))
 
-                    if eh_campanha_novo:
-                        # NÃO TOMADORES
-                        df_nao_tomadores = base_filtrada[
-                            base_filtrada['Mg_Emprestimo_Total'] ==
-                            base_filtrada['Mg_Emprestimo_Disponivel']
-                        ]
-
-                        # TOMADORES
-                        df_tomadores = base_filtrada[
-                            base_filtrada['Mg_Emprestimo_Total'] !=
-                            base_filtrada['Mg_Emprestimo_Disponivel']
-                        ]
-
-                        csv_nao_tomadores = converter_df_para_csv(df_nao_tomadores)
-                        csv_tomadores = converter_df_para_csv(df_tomadores)
-
-                        col1, col2, col3 = st.columns(3)
-
-                        with col1:
-                            st.download_button(
-                                "📄 Arquivo Completo",
-                                csv_completo,
-                                f"{params_gerais['convenio']}_novo_completo_{data_hoje}.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
-
-                        with col2:
-                            st.download_button(
-                                "🟢 Apenas Não Tomadores",
-                                csv_nao_tomadores,
-                                f"{params_gerais['convenio']}_nao_tomadores_{data_hoje}.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
-
-                        with col3:
-                            st.download_button(
-                                "🔵 Apenas Tomadores",
-                                csv_tomadores,
-                                f"{params_gerais['convenio']}_tomadores_{data_hoje}.csv",
-                                "text/csv",
-                                use_container_width=True
-                            )
-
-                    else:
-                        st.download_button(
-                            "📄 Baixar CSV da Campanha",
-                            csv_completo,
-                            f"{params_gerais['convenio']}_{params_gerais['tipo_campanha']}_{data_hoje}.csv",
-                            "text/csv",
-                            use_container_width=True
-                        )
-
-                else:
-                    st.warning(
-                        "Nenhum registro correspondeu aos filtros aplicados. "
-                        "Tente ajustar os parâmetros."
+                    # Partições (equipe, tomadores / não tomadores, banco) escritas numa única passada
+                    particoes = escrever_particoes(
+                        base_filtrada,
+                        params_gerais.get('dividir_por', []),
+                        converter_df_para_csv
                     )
+                    for rotulo, csv_particao in particoes.items():
+                        downloads.append((f"📄 {rotulo}", csv_particao, f"{convenio}_{rotulo}_{data_hoje}.csv"))
+
+                # O resultado fica na sessão para que paginação e filtros não exijam reprocessar
+                st.session_state.resultado_campanha = {
+                    "base": base_filtrada,
+                    "params": params_gerais,
+                    "restricoes": restricoes_db,
+                    "configs": configs_banco,
+                    "downloads": downloads,
+                    "origem": origem_resultado,
+                }
 
             except Exception as e:
+                st.session_state.pop('resultado_campanha', None)
                 st.error("Ocorreu um erro inesperado durante a filtragem:")
                 st.exception(e)
 
+    resultado = st.session_state.get('resultado_campanha')
+    if resultado is not None and resultado["origem"] != origem_resultado:
+        # Arquivos ou parâmetros mudaram desde a execução: o resultado e seus downloads não valem mais
+        st.session_state.pop('resultado_campanha', None)
+        resultado = None
+    if resultado is not None:
+        base_filtrada = resultado["base"]
+        if not base_filtrada.empty:
+            # --- LOGS DE VALIDAÇÃO ---
+            with st.expander("🔬 Parâmetros de Validação Utilizados no Filtro"):
+                st.subheader("Parâmetros Gerais")
+                st.json(resultado["params"])
+
+                st.subheader("Restrições Carregadas do Supabase")
+                st.json(resultado["restricoes"] or {})
+
+                st.subheader("Configurações de Banco e Produto")
+                st.json(resultado["configs"])
+
+            st.success("Filtros aplicados com sucesso!")
+            st.metric(
+                "Registros na campanha final:", 
+                f"{len(base_filtrada)} clientes"
+            )
+            exibir_resultado_paginado(base_filtrada, "campanha")
+
+            st.subheader("📥 Downloads da Campanha")
+            downloads = resultado["downloads"]
+            colunas_download = st.columns(min(len(downloads), 3))
+            for i, (rotulo, dados, nome_arquivo) in enumerate(downloads):
+                with colunas_download[i % len(colunas_download)]:
+                    st.download_button(
+                        rotulo,
+                        dados,
+                        nome_arquivo,
+                        "text/csv",
+                        use_container_width=True,
+                        key=f"download_{nome_arquivo}"
+                    )
+
+        else:
+            st.warning(
+                "Nenhum registro correspondeu aos filtros aplicados. "
+                "Tente ajustar os parâmetros."
+            )
+
 else:
     st.info(
         "Aguardando o carregamento dos arquivos CSV "
@@ -0,0 +1,121 @@
+# arquivos_servidor.py
+"""
+Ingestão de arquivos a partir de uma pasta do servidor.
+
+Arquivos muito grandes não precisam passar pelo upload HTTP: eles são listados
+numa pasta configurada e mapeados em memória (`pa.memory_map`), sendo lidos no
+lugar, sem cópia. Os objetos expõem a mesma interface usada dos uploads
+(`name`, `file_id`, `getbuffer`), então os carregadores, o registro de datasets
+e a projeção de colunas são os mesmos nos dois modos.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import streamlit as st
+
+from config import DIRETORIO_ARQUIVOS_SERVIDOR, INTERVALO_VIGIA_PASTA_S, ESTABILIDADE_ARQUIVO_S
+
+
+class ArquivoServidor:
+    """Arquivo CSV da pasta do servidor, mapeado em memória no primeiro acesso ao conteúdo."""
+
+    def __init__(self, caminho: Path):
+        estat = caminho.stat()
+        self.caminho = caminho
+        self.name = caminho.name
+        self.size = estat.st_size
+        self.modificado = estat.st_mtime
+        # Caminho, tamanho e data de modificação identificam o conteúdo sem precisar lê-lo
+        self.file_id = f"servidor:{caminho.resolve()}:{estat.st_size}:{estat.st_mtime_ns}"
+        self.impressao = hashlib.blake2b(self.file_id.encode('utf-8'), digest_size=16).hexdigest()
+        self._buffer = None
+
+    def getbuffer(self) -> memoryview:
+        """Conteúdo do arquivo mapeado em memória (sem cópia)."""
+        if self._buffer is None:
+            import pyarrow as pa
+            self._buffer = pa.memory_map(str(self.caminho), 'r').read_buffer()
+        return memoryview(self._buffer)
+
+
+def diretorio_configurado() -> Optional[Path]:
+    """Pasta de entrada do servidor, se existir."""
+    diretorio = Path(DIRETORIO_ARQUIVOS_SERVIDOR)
+    return diretorio if diretorio.is_dir() else None
+
+
+def listar_arquivos(diretorio: Path) -> Tuple[List[ArquivoServidor], List[str]]:
+    """
+    CSVs da pasta, em ordem de nome. Arquivos modificados há menos de ESTABILIDADE_ARQUIVO_S
+    segundos ainda podem estar sendo copiados e são devolvidos à parte, apenas pelo nome.
+    """
+    prontos, em_copia = [], []
+    agora = time.time()
+    for caminho in sorted(diretorio.glob('*.csv')):
+        try:
+            arquivo = ArquivoServidor(caminho)
+        except OSError:
+            continue
+        if agora - arquivo.modificado < ESTABILIDADE_ARQUIVO_S:
+            em_copia.append(arquivo.name)
+        else:
+            prontos.append(arquivo)
+    return prontos, em_copia
+
+
+def assinatura_pasta(diretorio: Path, arquivos: Optional[List[ArquivoServidor]] = None) -> Tuple:
+    """Nome, tamanho e data de modificação dos CSVs prontos (muda quando um arquivo novo fica pronto)."""
+    if arquivos is None:
+        arquivos, _ = listar_arquivos(diretorio)
+    return tuple((arquivo.name, arquivo.size, arquivo.modificado) for arquivo in arquivos)
+
+
+def selecionar_arquivos(key_prefix: str, local=st.sidebar) -> List[ArquivoServidor]:
+    """
+    Seleção de arquivos da pasta do servidor. No modo "acompanhar", todos os arquivos
+    prontos são usados e a pasta é verificada periodicamente: quando chega um arquivo
+    novo, a página é recarregada com ele.
+    """
+    diretorio = diretorio_configurado()
+    if diretorio is None:
+        local.warning(f"A pasta do servidor '{DIRETORIO_ARQUIVOS_SERVIDOR}' não foi encontrada.")
+        return []
+
+    arquivos, em_copia = listar_arquivos(diretorio)
+    if em_copia:
+        local.caption(f"Aguardando a cópia terminar: {', '.join(em_copia)}")
+
+    acompanhar = local.checkbox(
+        "Acompanhar a pasta (usar todos os arquivos, inclusive os novos)",
+        key=f"{key_prefix}_acompanhar_pasta"
+    )
+    if acompanhar:
+        selecionados = arquivos
+        local.caption(f"{len(arquivos)} arquivo(s) em {diretorio}")
+        _vigiar_pasta(diretorio, assinatura_pasta(diretorio, arquivos))
+    else:
+        por_nome = {arquivo.name: arquivo for arquivo in arquivos}
+        nomes = local.multiselect(
+            "Arquivos da pasta do servidor:",
+            list(por_nome),
+            format_func=lambda nome: f"{nome} ({por_nome[nome].size / 1024 ** 2:,.0f} MB)",
+            key=f"{key_prefix}_arquivos_pasta"
+        )
+        selecionados = [por_nome[nome] for nome in nomes]
+    return selecionados
+
+
+def _vigiar_pasta(diretorio: Path, assinatura_atual: Tuple) -> None:
+    """Recarrega a página quando o conteúdo da pasta muda (requer `st.fragment`)."""
+    if not hasattr(st, 'fragment'):
+        return
+
+    @st.fragment(run_every=INTERVALO_VIGIA_PASTA_S)
+    def _verificar():
+        if assinatura_pasta(diretorio) != assinatura_atual:
+            st.rerun()
+
+    _verificar()
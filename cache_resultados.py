@@ -0,0 +1,214 @@
+# cache_resultados.py
+"""
+Cache endereçado por conteúdo para os resultados de campanhas.
+
+A chave combina a impressão digital do dataset (a chave dada pelo carregador,
+calculada sobre os arquivos; na falta dela, o hash das linhas), os parâmetros gerais, as
+configurações de banco, a versão das restrições, a versão do índice de
+supressão e a versão do código de filtragem. O resultado finalizado é gravado em Parquet, com despejo LRU
+limitado pelo tamanho total do diretório.
+"""
+
+import hashlib
+import json
+import os
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from config import DIRETORIO_CACHE_RESULTADOS, LIMITE_CACHE_RESULTADOS_MB
+from supressao import versao_indice
+
+# A data em 'Campanha' é a única parte não determinística da saída.
+# Ela é gravada com este marcador e substituída pela data do dia no acerto.
+MARCADOR_DATA = '{data}'
+
+# Quantidade de resultados mantidos em memória para acertos imediatos
+_TAMANHO_MEMO = 4
+
+# Os carregadores entram na versão porque a chave do dataset dada por eles não lê as linhas
+_ARQUIVOS_CODIGO = ('filters.py', 'config.py', 'supressao.py', 'regras_convenio.py', 'particionamento.py',
+                    'calculo_valores.py', 'data_handler.py', 'leitor_csv.py', 'deduplicacao.py')
+
+_memo: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_impressoes: dict = {}
+
+
+def _hash(*partes: bytes) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        h.update(parte)
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def _serializar(obj) -> bytes:
+    """Serialização canônica (chaves ordenadas, datas em ISO) para compor a chave."""
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _versao_codigo() -> str:
+    """Hash do código-fonte que influencia o resultado da filtragem."""
+    raiz = Path(__file__).resolve().parent
+    conteudos = []
+    for nome in _ARQUIVOS_CODIGO:
+        try:
+            conteudos.append((raiz / nome).read_bytes())
+        except OSError:
+            conteudos.append(nome.encode('utf-8'))
+    return _hash(*conteudos)
+
+
+VERSAO_CODIGO = _versao_codigo()
+
+
+def impressao_digital_dataset(df: pd.DataFrame) -> str:
+    """
+    Calcula (uma vez por objeto) a impressão digital do conteúdo de um DataFrame.
+    Considera nomes e tipos das colunas e o hash de todas as linhas.
+    """
+    registro = _impressoes.get(id(df))
+    if registro is not None and registro[0]() is df:
+        return registro[1]
+
+    linhas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    esquema = _serializar([[str(c), str(t)] for c, t in df.dtypes.items()])
+    impressao = _hash(esquema, linhas.tobytes())
+
+    chave_id = id(df)
+    _impressoes[chave_id] = (weakref.ref(df, lambda _ref: _impressoes.pop(chave_id, None)), impressao)
+    return impressao
+
+
+def versao_restricoes(restricoes_db: Optional[dict]) -> str:
+    """Versão das restrições: hash do conteúdo, independente da ordem dos valores."""
+    normalizado = {tipo: sorted(map(str, valores)) for tipo, valores in (restricoes_db or {}).items()}
+    return _hash(_serializar(normalizado))
+
+
+def _partes_contexto(params: dict, configs_banco: list, restricoes_db: Optional[dict]) -> tuple:
+    versao_supressao = versao_indice(params.get('equipe')) if params.get('aplicar_supressao') else ''
+    return (
+        _serializar(params),
+        _serializar(configs_banco),
+        versao_restricoes(restricoes_db).encode('utf-8'),
+        versao_supressao.encode('utf-8'),
+        VERSAO_CODIGO.encode('utf-8'),
+    )
+
+
+def chave_resultado(df: pd.DataFrame, params: dict, configs_banco: list, restricoes_db: Optional[dict] = None,
+                    impressao: Optional[str] = None) -> str:
+    """
+    Monta a chave do cache para uma execução de `aplicar_filtros`.
+    `impressao` é a chave do dataset dada pelo carregador (conteúdo dos arquivos, projeção
+    e opções, ver `data_handler.carregar_dataset`); sem ela, todas as linhas são lidas.
+    """
+    impressao = impressao or impressao_digital_dataset(df)
+    return _hash(impressao.encode('utf-8'), *_partes_contexto(params, configs_banco, restricoes_db))
+
+
+def chave_contexto(params: dict, configs_banco: list, restricoes_db: Optional[dict] = None) -> str:
+    """Chave de tudo o que define a campanha, exceto o dataset."""
+    return _hash(*_partes_contexto(params, configs_banco, restricoes_db))
+
+
+def _diretorio() -> Path:
+    diretorio = Path(DIRETORIO_CACHE_RESULTADOS)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _lembrar(chave: str, base: pd.DataFrame) -> None:
+    _memo[chave] = base
+    _memo.move_to_end(chave)
+    while len(_memo) > _TAMANHO_MEMO:
+        _memo.popitem(last=False)
+
+
+def _aplicar_data(base: pd.DataFrame, data_hoje: str) -> pd.DataFrame:
+    if 'Campanha' not in base.columns:
+        return base
+    campanha = base['Campanha'].astype(str).str.replace(MARCADOR_DATA, data_hoje, regex=False)
+    return base.assign(Campanha=campanha)
+
+
+def _remover_data(base: pd.DataFrame, data_hoje: str) -> pd.DataFrame:
+    if 'Campanha' not in base.columns:
+        return base
+    campanha = base['Campanha'].astype(str).str.replace(data_hoje, MARCADOR_DATA, regex=False)
+    return base.assign(Campanha=campanha.astype('category'))
+
+
+def obter_resultado(chave: str, data_hoje: str) -> Optional[pd.DataFrame]:
+    """Retorna o resultado armazenado para a chave (com a data do dia) ou None."""
+    base = _memo.get(chave)
+    if base is None:
+        caminho = _diretorio() / f"{chave}.parquet"
+        if not caminho.exists():
+            return None
+        try:
+            base = pd.read_parquet(caminho)
+            os.utime(caminho)  # marca o uso para o despejo LRU
+        except Exception:
+            return None
+    _lembrar(chave, base)
+    return _aplicar_data(base, data_hoje)
+
+
+def _despejar(limite_bytes: int) -> None:
+    """Remove os arquivos menos usados até o cache caber no limite."""
+    arquivos = []
+    for caminho in _diretorio().glob('*.parquet'):
+        try:
+            info = caminho.stat()
+        except OSError:
+            continue
+        arquivos.append((info.st_mtime, info.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= limite_bytes:
+            break
+        caminho.unlink(missing_ok=True)
+        total -= tamanho
+
+
+def armazenar_resultado(chave: str, base: pd.DataFrame, data_hoje: str) -> None:
+    """Grava o resultado finalizado no cache. Falhas de gravação não interrompem a campanha."""
+    compacta = _remover_data(base, data_hoje)
+    _lembrar(chave, compacta)
+    caminho = _diretorio() / f"{chave}.parquet"
+    temporario = caminho.with_suffix('.tmp')
+    try:
+        compacta.to_parquet(temporario, index=False, compression='zstd')
+        os.replace(temporario, caminho)
+    except Exception:
+        temporario.unlink(missing_ok=True)
+        return
+    _despejar(LIMITE_CACHE_RESULTADOS_MB * 1024 * 1024)
+
+
+def aplicar_filtros_com_cache(df: pd.DataFrame, params: dict, configs_banco: list, restricoes_db: Optional[dict] = None,
+                              impressao: Optional[str] = None) -> pd.DataFrame:
+    """
+    Versão de `aplicar_filtros` que reaproveita resultados de execuções idênticas.
+    `impressao` é a chave do dataset dada pelo carregador (ver `chave_resultado`).
+    """
+    # Os filtros só são importados na primeira geração de campanha
+    from filters import aplicar_filtros, data_campanha
+
+    chave = chave_resultado(df, params, configs_banco, restricoes_db, impressao)
+    data_hoje = data_campanha()
+
+    resultado = obter_resultado(chave, data_hoje)
+    if resultado is not None:
+        return resultado
+
+    resultado = aplicar_filtros(df, params, configs_banco)
+    if not resultado.empty:
+        armazenar_resultado(chave, resultado, data_hoje)
+    return resultado
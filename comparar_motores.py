@@ -0,0 +1,360 @@
+# comparar_motores.py
+"""
+Comparação diferencial entre o motor de referência e um motor candidato.
+
+O motor de referência é uma versão congelada do código (uma revisão do git ou
+um diretório) e o candidato é, por padrão, a árvore atual. Entradas aleatórias
+(semeadas) cobrem todos os tipos de campanha, os convênios com regras próprias,
+os modos de margem de segurança e os modos de condição, além do Filtro Master.
+Cada motor roda num processo separado sobre as mesmas entradas; as saídas são
+comparadas célula a célula (colunas monetárias com tolerância) e o tempo de
+cada caso é registrado junto com o ganho de velocidade.
+
+Uso:
+    python comparar_motores.py comparar --referencia HEAD~1
+    python comparar_motores.py comparar --referencia-dir referencia/ --linhas 20000
+    python comparar_motores.py congelar --referencia HEAD --destino referencia/
+"""
+
+import argparse
+import datetime
+import io
+import json
+import pickle
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+RAIZ_REPOSITORIO = Path(__file__).resolve().parent
+
+TIPOS_CAMPANHA = ['Novo', 'Benefício', 'Cartão', 'Benefício & Cartão']
+# Convênios com regras próprias e um convênio sem regras (usa as regras padrão)
+CONVENIOS = ['govsp', 'goval', 'govam', 'govmt', 'prefrj', 'govpi', 'govce', 'outro']
+MODOS_MARGEM = [(False, None, 0), (True, 'Percentual (%)', 5.0), (True, 'Valor Fixo (R$)', 50.0)]
+MODOS_CONDICAO = ['Aplicar a toda a base', 'Escolher valor único', 'Usar palavras-chave']
+
+LOTACOES = ['ALESP', 'SEDUC', 'SESAU', 'PM', 'DETRAN', None]
+SECRETARIAS = ['EDUCACAO', 'SAUDE', 'SEGURANCA', 'FAZENDA', None]
+VINCULOS = ['EFETIVO', 'COMISSIONADO', 'APOSENTADO', 'PENSIONISTA', None]
+BANCOS = ['2', '74', '243', '318', '623', '707']
+
+TOLERANCIA_MONETARIA = 0.01
+_COLUNA_MONETARIA = re.compile(r'valor|comissao|parcela', re.IGNORECASE)
+
+
+# =============================================================================
+# Geração das entradas
+# =============================================================================
+def gerar_base(n: int, convenio: str, rng: np.random.Generator) -> pd.DataFrame:
+    """Base de higienização aleatória: margens iguais/diferentes/negativas, nulos e CPFs repetidos."""
+    base = {
+        'Origem_Dado': 'hig',
+        'Nome_Cliente': [f'SERVIDOR {i}' for i in range(n)],
+        'Matricula': [str(100000 + i) for i in rng.integers(0, max(n // 2, 1), n)],
+        'CPF': [f'{i // 1000:03d}.{i % 1000:03d}.{i % 777:03d}-{i % 100:02d}' for i in rng.integers(0, n * 2, n)],
+        'Data_Nascimento': pd.to_datetime(rng.integers(-12000, 15000, n), unit='D').strftime('%d/%m/%Y'),
+        'Convenio': convenio,
+        'Vinculo_Servidor': rng.choice(np.array(VINCULOS, dtype=object), n),
+        'Lotacao': rng.choice(np.array(LOTACOES, dtype=object), n),
+        'Secretaria': rng.choice(np.array(SECRETARIAS, dtype=object), n),
+    }
+    for produto in ['Emprestimo', 'Beneficio_Saque', 'Cartao', 'Beneficio_Compra', 'Compulsoria']:
+        total = rng.uniform(0, 2000, n).round(2)
+        disponivel = np.where(rng.random(n) < 0.5, total, (total - rng.uniform(-100, 2000, n)).round(2))
+        disponivel[rng.random(n) < 0.01] = np.nan
+        base[f'MG_{produto}_Total'] = total
+        base[f'MG_{produto}_Disponivel'] = disponivel
+    for k in range(1, 5):
+        base[f'FONE{k}'] = [f'119{x:08d}' if x % 3 else None for x in rng.integers(0, 10 ** 8, n)]
+    return pd.DataFrame(base)
+
+
+def gerar_base_simulacoes(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Base do Filtro Master: todas as colunas como texto e simulações em formatos BR e US."""
+    base = gerar_base(n, 'govsp', rng)
+    simulacoes = []
+    for _ in range(n):
+        itens = []
+        for prazo in rng.choice([24, 48, 72, 84, 96], rng.integers(1, 4), replace=False):
+            valor, parcela = rng.uniform(100, 20000), rng.uniform(10, 900)
+            if rng.random() < 0.5:
+                itens.append(f"{prazo}x: {valor:,.2f} (parcela: {parcela:,.2f})".replace(',', '#').replace('.', ',').replace('#', '.'))
+            else:
+                itens.append(f"{prazo}x: {valor:.2f} (parcela: {parcela:.2f})")
+        simulacoes.append('|'.join(itens))
+    base['Simulacoes'] = simulacoes
+    base['Saldo_Devedor'] = np.where(rng.random(n) < 0.5, rng.uniform(0, 5000, n).round(2), 0)
+    return base.astype(object).where(base.notna(), None).astype('str')
+
+
+def _config_banco(rng: np.random.Generator, modo_margem: tuple, modo_condicao: str, tipo: str) -> Dict:
+    usa, modo, valor = modo_margem
+    config = {
+        'banco': str(rng.choice(BANCOS)),
+        'coeficiente': round(float(rng.uniform(5, 35)), 4),
+        'coeficiente2': round(float(rng.uniform(5, 35)), 4),
+        'comissao': round(float(rng.uniform(1, 15)), 2),
+        'parcelas': int(rng.choice([48, 72, 84, 96])),
+        'coeficiente_parcela': round(float(rng.uniform(15, 35)), 4),
+        'usar_margem_compra': bool(rng.random() < 0.5),
+        'usa_margem_seguranca': usa,
+        'modo_margem_seguranca': modo,
+        'valor_margem_seguranca': valor,
+        'modo_condicional': modo_condicao,
+        'coluna_condicional': 'Aplicar a toda a base',
+        'valor_condicional': None,
+    }
+    if tipo == 'Benefício & Cartão':
+        config['cartao_escolhido'] = str(rng.choice(['Benefício', 'Consignado']))
+    if modo_condicao == 'Escolher valor único':
+        config['coluna_condicional'], valores = [('Lotacao', LOTACOES), ('Vinculo_Servidor', VINCULOS),
+                                                  ('Secretaria', SECRETARIAS)][rng.integers(0, 3)]
+        config['valor_condicional'] = str(rng.choice([v for v in valores if v]))
+    elif modo_condicao == 'Usar palavras-chave':
+        config['coluna_condicional'] = 'Secretaria'
+        config['valor_condicional'] = '; '.join(rng.choice(['educ', 'saude', 'SEGUR', 'faz'], 2, replace=False))
+    return config
+
+
+def _params_campanha(rng: np.random.Generator, tipo: str, convenio: str, basico: bool) -> Dict:
+    params = {
+        'tipo_campanha': tipo,
+        'convenio': convenio,
+        'equipe': 'outbound',
+        'comissao_minima': float(rng.choice([0.0, 10.0, 50.0])),
+        'margem_limite': float(rng.choice([0.0, 300.0, 1500.0])) if tipo == 'Novo' else float(rng.choice([500.0, 999999.0])),
+        'data_limite_idade': datetime.date(1950, 1, 1) if rng.random() < 0.5 else None,
+        'selecao_lotacao': ['PM'] if rng.random() < 0.5 else [],
+        'selecao_vinculos': ['PENSIONISTA'] if rng.random() < 0.3 else [],
+        'convai_percent': float(rng.choice([0, 20])),
+    }
+    if not basico:
+        if rng.random() < 0.3:
+            params['equipes_adicionais'] = {'csapp': 10.0}
+        if rng.random() < 0.3:
+            params['limite_clientes'] = 200
+        if rng.random() < 0.2:
+            params['cota_por'], params['cota_por_grupo'] = str(rng.choice(['Lotacao', 'Banco'])), 50
+    return params
+
+
+def gerar_casos(n_linhas: int, semente: int, basico: bool = False) -> List[Dict]:
+    """
+    Casos de comparação: para cada campanha e convênio, um caso por modo de margem de
+    segurança, com configurações de banco que percorrem todos os modos de condição.
+    """
+    rng = np.random.default_rng(semente)
+    casos = []
+    for convenio in CONVENIOS:
+        base = gerar_base(n_linhas, convenio, rng)
+        for tipo in TIPOS_CAMPANHA:
+            for modo_margem in MODOS_MARGEM:
+                configs = [_config_banco(rng, modo_margem, modo_condicao, tipo)
+                           for modo_condicao in MODOS_CONDICAO for _ in range(int(rng.integers(1, 3)))]
+                rng.shuffle(configs)
+                casos.append({
+                    'nome': f"{convenio} | {tipo} | {modo_margem[1] or 'sem margem'}",
+                    'motor': 'campanha',
+                    'base': base,
+                    'params': _params_campanha(rng, tipo, convenio, basico),
+                    'configs': configs,
+                })
+    base_simulacoes = gerar_base_simulacoes(n_linhas, rng)
+    for filtrar_saldo in (False, True):
+        casos.append({
+            'nome': f"Filtro Master | saldo devedor {'sim' if filtrar_saldo else 'não'}",
+            'motor': 'simulacoes',
+            'base': base_simulacoes,
+            'params': {'equipe': 'outbound', 'comissao_banco': 0.1, 'comissao_minima': 50.0,
+                       'filtrar_saldo_devedor': filtrar_saldo},
+        })
+    return casos
+
+
+# =============================================================================
+# Execução dos motores (cada um num processo próprio)
+# =============================================================================
+def _executar_casos(raiz: Path, entrada: Path, repeticoes: int) -> None:
+    """Roda todos os casos com o código de `raiz` (chamado no processo filho)."""
+    sys.path.insert(0, str(raiz))
+    import filters
+
+    with open(entrada / 'casos.pkl', 'rb') as f:
+        casos = pickle.load(f)
+    tempos = []
+    for i, caso in enumerate(casos):
+        melhor = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            try:
+                if caso['motor'] == 'simulacoes':
+                    resultado = filters.aplicar_filtro_simulacoes(caso['base'], dict(caso['params']))
+                else:
+                    resultado = filters.aplicar_filtros(caso['base'], dict(caso['params']), caso['configs'])
+            except Exception as e:
+                # O erro também é uma saída: os dois motores devem falhar (ou não) nos mesmos casos
+                resultado = f"{type(e).__name__}: {e}"
+            melhor = min(melhor, time.perf_counter() - inicio)
+        tempos.append(melhor)
+        pd.to_pickle(resultado, entrada / f'resultado_{i}.pkl')
+    (entrada / 'tempos.json').write_text(json.dumps(tempos))
+
+
+def _rodar_motor(raiz: Path, casos_pkl: Path, repeticoes: int) -> Path:
+    saida = Path(tempfile.mkdtemp(prefix='motor_'))
+    (saida / 'casos.pkl').write_bytes(casos_pkl.read_bytes())
+    # Diretório de trabalho isolado: caches locais (supressão, resultados) não são compartilhados
+    subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '_executar', '--raiz', str(raiz),
+         '--entrada', str(saida), '--repeticoes', str(repeticoes)],
+        check=True, cwd=saida
+    )
+    return saida
+
+
+def extrair_revisao(revisao: str, destino: Optional[Path] = None) -> Path:
+    """Extrai os arquivos de uma revisão do git (motor congelado) para um diretório."""
+    destino = destino or Path(tempfile.mkdtemp(prefix='referencia_'))
+    destino.mkdir(parents=True, exist_ok=True)
+    conteudo = subprocess.run(['git', 'archive', '--format=tar', revisao], cwd=RAIZ_REPOSITORIO,
+                              check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(conteudo)) as tar:
+        tar.extractall(destino)
+    return destino
+
+
+# =============================================================================
+# Comparação
+# =============================================================================
+def comparar_resultados(referencia, candidato, tolerancia: float = TOLERANCIA_MONETARIA) -> List[str]:
+    """
+    Diferenças entre as saídas, célula a célula e na mesma ordem de linhas.
+    Colunas monetárias (valor, comissão, parcela) aceitam diferença de até `tolerancia`;
+    as demais são comparadas como texto, como aparecem no CSV. Uma saída em texto é o
+    erro levantado pelo motor.
+    """
+    if isinstance(referencia, str) or isinstance(candidato, str):
+        if isinstance(referencia, str) and isinstance(candidato, str):
+            return [] if referencia == candidato else [f"erros diferentes: {referencia} != {candidato}"]
+        erro = referencia if isinstance(referencia, str) else candidato
+        motor = 'referência' if isinstance(referencia, str) else 'candidato'
+        return [f"só o motor {motor} falhou: {erro}"]
+    if list(referencia.columns) != list(candidato.columns):
+        return [f"colunas diferentes: {list(referencia.columns)} != {list(candidato.columns)}"]
+    if len(referencia) != len(candidato):
+        return [f"número de linhas diferente: {len(referencia)} != {len(candidato)}"]
+
+    diferencas = []
+    for coluna in referencia.columns:
+        a, b = referencia[coluna].reset_index(drop=True), candidato[coluna].reset_index(drop=True)
+        if _COLUNA_MONETARIA.search(coluna):
+            va, vb = pd.to_numeric(a, errors='coerce').to_numpy(), pd.to_numeric(b, errors='coerce').to_numpy()
+            ambos_nulos = np.isnan(va) & np.isnan(vb)
+            diferente = ~ambos_nulos & ~(np.abs(va - vb) <= tolerancia)
+        else:
+            texto_a = a.astype(object).where(a.notna(), '').astype(str).to_numpy()
+            texto_b = b.astype(object).where(b.notna(), '').astype(str).to_numpy()
+            diferente = texto_a != texto_b
+        if diferente.any():
+            linha = int(np.flatnonzero(diferente)[0])
+            diferencas.append(
+                f"{coluna}: {int(diferente.sum())} célula(s); linha {linha}: {a.iloc[linha]!r} != {b.iloc[linha]!r}"
+            )
+    return diferencas
+
+
+def comparar(raiz_referencia: Path, raiz_candidato: Path, n_linhas: int, semente: int,
+             tolerancia: float, repeticoes: int, basico: bool) -> List[Dict]:
+    """Roda os dois motores sobre os mesmos casos e devolve o relatório por caso."""
+    casos = gerar_casos(n_linhas, semente, basico)
+    with tempfile.TemporaryDirectory() as temporario:
+        casos_pkl = Path(temporario) / 'casos.pkl'
+        with open(casos_pkl, 'wb') as f:
+            pickle.dump(casos, f)
+        saida_ref = _rodar_motor(raiz_referencia, casos_pkl, repeticoes)
+        saida_cand = _rodar_motor(raiz_candidato, casos_pkl, repeticoes)
+
+    tempos_ref = json.loads((saida_ref / 'tempos.json').read_text())
+    tempos_cand = json.loads((saida_cand / 'tempos.json').read_text())
+    relatorio = []
+    for i, caso in enumerate(casos):
+        referencia = pd.read_pickle(saida_ref / f'resultado_{i}.pkl')
+        candidato = pd.read_pickle(saida_cand / f'resultado_{i}.pkl')
+        relatorio.append({
+            'caso': caso['nome'],
+            'linhas': len(referencia) if isinstance(referencia, pd.DataFrame) else referencia,
+            'diferencas': comparar_resultados(referencia, candidato, tolerancia),
+            'tempo_referencia': tempos_ref[i],
+            'tempo_candidato': tempos_cand[i],
+            'ganho': tempos_ref[i] / tempos_cand[i] if tempos_cand[i] else float('inf'),
+        })
+    return relatorio
+
+
+def _imprimir(relatorio: List[Dict]) -> None:
+    for item in relatorio:
+        situacao = 'OK  ' if not item['diferencas'] else 'DIFF'
+        linhas = f"{item['linhas']:>7} linhas" if isinstance(item['linhas'], int) else f"erro: {item['linhas'][:40]}"
+        print(f"{situacao} {item['caso']:<55} {linhas}  "
+              f"ref {item['tempo_referencia']:.3f}s  cand {item['tempo_candidato']:.3f}s  x{item['ganho']:.2f}")
+        for diferenca in item['diferencas'][:5]:
+            print(f"       {diferenca}")
+    falhas = sum(1 for item in relatorio if item['diferencas'])
+    total_ref = sum(item['tempo_referencia'] for item in relatorio)
+    total_cand = sum(item['tempo_candidato'] for item in relatorio)
+    print(f"\n{len(relatorio) - falhas}/{len(relatorio)} casos iguais; "
+          f"tempo total ref {total_ref:.2f}s, cand {total_cand:.2f}s (x{total_ref / max(total_cand, 1e-9):.2f})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_comparar = comandos.add_parser('comparar', help='compara o motor candidato com o de referência')
+    p_comparar.add_argument('--referencia', default='HEAD', help='revisão do git usada como referência')
+    p_comparar.add_argument('--referencia-dir', type=Path, help='diretório com o motor de referência congelado')
+    p_comparar.add_argument('--candidato-dir', type=Path, default=RAIZ_REPOSITORIO)
+    p_comparar.add_argument('--linhas', type=int, default=2000)
+    p_comparar.add_argument('--semente', type=int, default=0)
+    p_comparar.add_argument('--tolerancia', type=float, default=TOLERANCIA_MONETARIA)
+    p_comparar.add_argument('--repeticoes', type=int, default=1)
+    p_comparar.add_argument('--basico', action='store_true',
+                            help='usa só os parâmetros originais (sem limite, cotas ou equipes adicionais)')
+    p_comparar.add_argument('--relatorio', type=Path, help='grava o relatório em JSON')
+
+    p_congelar = comandos.add_parser('congelar', help='extrai uma revisão como motor de referência')
+    p_congelar.add_argument('--referencia', default='HEAD')
+    p_congelar.add_argument('--destino', type=Path, required=True)
+
+    p_executar = comandos.add_parser('_executar')
+    p_executar.add_argument('--raiz', type=Path, required=True)
+    p_executar.add_argument('--entrada', type=Path, required=True)
+    p_executar.add_argument('--repeticoes', type=int, default=1)
+
+    args = parser.parse_args(argv)
+    if args.comando == '_executar':
+        _executar_casos(args.raiz, args.entrada, args.repeticoes)
+        return 0
+    if args.comando == 'congelar':
+        print(f"Motor de referência extraído em {extrair_revisao(args.referencia, args.destino)}")
+        return 0
+
+    raiz_referencia = args.referencia_dir or extrair_revisao(args.referencia)
+    relatorio = comparar(raiz_referencia, args.candidato_dir, args.linhas, args.semente,
+                         args.tolerancia, args.repeticoes, args.basico)
+    _imprimir(relatorio)
+    if args.relatorio:
+        args.relatorio.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    return 1 if any(item['diferencas'] for item in relatorio) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
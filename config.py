@@ -3,6 +3,8 @@
 Módulo para armazenar constantes e configurações da aplicação.
 """
 
+import os
+
 # Mapeamento de nomes de bancos para seus respectivos códigos
 BANCOS_MAPEAMENTO = {
     "2 - MeuCashCard": "2",
@@ -54,3 +56,157 @@ ORDEM_COLUNAS_FINAL = [
     'prazo_emprestimo', 'prazo_beneficio', 'prazo_cartao',
     'Campanha'
 ]
+
+# Cache de resultados de campanhas (diretório local e tamanho máximo em MB)
+DIRETORIO_CACHE_RESULTADOS = '.cache/resultados'
+LIMITE_CACHE_RESULTADOS_MB = 512
+
+# Colunas de entrada usadas pelo pré-processamento e pelas condições de banco,
+# além das colunas de ORDEM_COLUNAS_FINAL
+COLUNAS_ENTRADA_BASE = ['Matricula', 'CPF', 'Nome_Cliente', 'Data_Nascimento', 'Convenio',
+                        'Lotacao', 'Vinculo_Servidor', 'Secretaria']
+
+# Colunas extras usadas pelo Filtro Master (simulações)
+COLUNAS_SIMULACOES = ['Simulacoes', 'Saldo_Devedor']
+
+# Memória máxima (MB) das bases mantidas no registro de datasets do processo
+LIMITE_REGISTRO_DATASETS_MB = 4096
+
+# Índice local de CPFs suprimidos
+DIRETORIO_SUPRESSAO = '.cache/supressao'
+
+# Tipos de lista de supressão (rótulo na interface -> tipo gravado no índice)
+TIPOS_SUPRESSAO = {
+    'Campanha anterior': 'campanha',
+    'Opt-out (não contatar)': 'optout',
+    'Cooldown da equipe': 'cooldown',
+}
+
+# Deduplicação de CPF/Matrícula entre arquivos (rótulo na interface -> política)
+POLITICAS_DEDUPLICACAO = {
+    'Manter todos': None,
+    'Manter arquivo mais recente': 'mais_recente',
+    'Manter maior margem disponível': 'maior_margem',
+    'Mesclar telefones': 'mesclar_telefones',
+}
+
+# Tipos de campanha, na ordem da barra lateral
+TIPOS_CAMPANHA = ['Novo', 'Benefício', 'Cartão', 'Benefício & Cartão']
+
+# Margem comparada pela política 'maior_margem', por tipo de campanha
+MARGEM_DEDUPLICACAO = {
+    'Novo': 'MG_Emprestimo_Disponivel',
+    'Benefício': 'MG_Beneficio_Saque_Disponivel',
+    'Cartão': 'MG_Cartao_Disponivel',
+    'Benefício & Cartão': 'MG_Beneficio_Saque_Disponivel',
+}
+
+# =============================================================================
+# Regras por convênio
+# =============================================================================
+# As regras são expressões sobre as colunas da base (compiladas uma vez, ver `regras_convenio`).
+# 'etapas' roda em ordem antes dos cálculos:
+#   - {'filtrar': expr}: mantém as linhas em que a expressão é verdadeira;
+#   - {'excluir_matriculas': expr}: remove todas as linhas das matrículas com alguma linha verdadeira;
+#   - {'zerar_matriculas': expr, 'produto': p}: o valor liberado do produto é zerado para as
+#     matrículas com alguma linha verdadeira (apurado neste ponto das etapas).
+# 'margens' define, por produto, os casos de margem; vale o primeiro caso aplicável à linha:
+#   - 'margem': expressão da margem; 'coeficiente': chave do coeficiente na configuração do banco;
+#   - 'quando': condição da linha; 'config': valores exigidos na configuração do banco;
+#   - 'valor_zero_se': condição em que o valor liberado é zero.
+# Linhas sem caso aplicável ficam sem valor. Um convênio sobrescreve 'etapas' e/ou as margens
+# dos produtos que declarar; o restante vem de REGRAS_CONVENIO_PADRAO.
+
+MARGEM_CARTAO = {
+    'margem': 'MG_Cartao_Disponivel',
+    'valor_zero_se': 'MG_Cartao_Total != MG_Cartao_Disponivel',
+}
+
+MARGEM_BENEFICIO_GOVAL = [
+    {
+        'quando': '(MG_Beneficio_Saque_Disponivel == MG_Beneficio_Saque_Total) & '
+                  '(MG_Beneficio_Compra_Disponivel == MG_Beneficio_Compra_Total)',
+        'margem': 'MG_Beneficio_Saque_Disponivel + MG_Beneficio_Compra_Disponivel',
+    },
+    {'margem': 'MG_Beneficio_Saque_Disponivel', 'coeficiente': 'coeficiente2'},
+]
+
+REGRAS_CONVENIO_PADRAO = {
+    'Novo': {
+        'etapas': [],
+        'margens': {'emprestimo': [{'margem': 'MG_Emprestimo_Disponivel'}]},
+    },
+    'Benefício': {
+        'etapas': [{'filtrar': 'MG_Beneficio_Saque_Disponivel == MG_Beneficio_Saque_Total'}],
+        'margens': {'beneficio': [{'margem': 'MG_Beneficio_Saque_Disponivel'}]},
+    },
+    'Cartão': {
+        'etapas': [],
+        'margens': {'cartao': [MARGEM_CARTAO]},
+    },
+    'Benefício & Cartão': {
+        'etapas': [],
+        'margens': {'beneficio': [{'margem': 'MG_Beneficio_Saque_Disponivel'}], 'cartao': [MARGEM_CARTAO]},
+    },
+}
+
+REGRAS_CONVENIO = {
+    'govsp': {
+        'Novo': {'etapas': [{'excluir_matriculas': 'MG_Emprestimo_Disponivel < 0'}]},
+        'Benefício': {'etapas': [
+            {'zerar_matriculas': 'MG_Beneficio_Saque_Total > MG_Beneficio_Saque_Disponivel', 'produto': 'beneficio'},
+            {'filtrar': 'MG_Beneficio_Saque_Disponivel == MG_Beneficio_Saque_Total'},
+            {'filtrar': "Lotacao != 'ALESP'"},
+        ]},
+        'Cartão': {'etapas': [
+            {'filtrar': "Lotacao != 'ALESP'"},
+            {'zerar_matriculas': 'MG_Cartao_Total > MG_Cartao_Disponivel', 'produto': 'cartao'},
+        ]},
+        'Benefício & Cartão': {'etapas': [
+            {'filtrar': "Lotacao != 'ALESP'"},
+            {'zerar_matriculas': 'MG_Beneficio_Saque_Total > MG_Beneficio_Saque_Disponivel', 'produto': 'beneficio'},
+            {'zerar_matriculas': 'MG_Cartao_Total > MG_Cartao_Disponivel', 'produto': 'cartao'},
+        ]},
+    },
+    'govmt': {
+        'Novo': {'etapas': [{'filtrar': 'MG_Compulsoria_Disponivel >= 0'}]},
+    },
+    'goval': {
+        'Benefício': {'etapas': [], 'margens': {'beneficio': MARGEM_BENEFICIO_GOVAL}},
+        'Benefício & Cartão': {'margens': {'beneficio': MARGEM_BENEFICIO_GOVAL}},
+    },
+    'govam': {
+        'Benefício': {'margens': {'beneficio': [
+            {
+                'config': {'usar_margem_compra': True},
+                'quando': '(MG_Beneficio_Compra_Total == MG_Beneficio_Compra_Disponivel) & '
+                          '(MG_Beneficio_Saque_Total == MG_Beneficio_Saque_Disponivel)',
+                'margem': 'MG_Beneficio_Compra_Disponivel',
+            },
+            {
+                'config': {'usar_margem_compra': False},
+                'quando': '(MG_Beneficio_Compra_Total != MG_Beneficio_Compra_Disponivel) & '
+                          '(MG_Beneficio_Saque_Total == MG_Beneficio_Saque_Disponivel)',
+                'margem': 'MG_Beneficio_Saque_Disponivel',
+            },
+        ]}},
+    },
+    'prefrj': {'Benefício': {'etapas': []}},
+    'govpi': {'Benefício': {'etapas': []}},
+    'govce': {'Benefício': {'etapas': []}},
+}
+
+# Busca de restrições no Supabase: tempo máximo de espera (s) e validade de uma resposta (s)
+TIMEOUT_RESTRICOES_S = 10
+VALIDADE_RESTRICOES_S = 300
+# Após uma falha, a próxima busca espera de INTERVALO_MIN até INTERVALO_MAX segundos (dobrando a cada falha)
+INTERVALO_MIN_NOVA_BUSCA_S = 15
+INTERVALO_MAX_NOVA_BUSCA_S = 600
+# Última resposta válida de cada convênio/produto, usada quando a busca falha (inclusive após reiniciar)
+DIRETORIO_RESTRICOES = '.cache/restricoes'
+
+# Pasta do servidor com arquivos de higienização (ingestão sem upload, para arquivos grandes)
+DIRETORIO_ARQUIVOS_SERVIDOR = os.environ.get('FILTRO_DIRETORIO_ARQUIVOS', 'dados/entrada')
+# Intervalo (s) de verificação da pasta acompanhada e tempo (s) sem modificação para um arquivo ser lido
+INTERVALO_VIGIA_PASTA_S = 30
+ESTABILIDADE_ARQUIVO_S = 5
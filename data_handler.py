@@ -1,99 +1,370 @@
 # data_handler.py
 import streamlit as st
 import pandas as pd
-from supabase import create_client, Client
-from typing import List, Dict
-
-# Usa o cache do Streamlit para evitar recarregar os mesmos arquivos repetidamente.
-# A função só será re-executada se os arquivos carregados mudarem.
-@st.cache_data
-def carregar_arquivos_csv(files: List[st.runtime.uploaded_file_manager.UploadedFile]) -> pd.DataFrame:
-    """Junta múltiplos arquivos CSV carregados em um único DataFrame."""
+from typing import List, Dict, Optional, TYPE_CHECKING
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import registro_datasets
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from perfil_dataset import calcular_perfil
+
+# Supabase (e sua pilha HTTP) e o leitor Arrow só são importados no primeiro uso
+if TYPE_CHECKING:
+    from supabase import Client
+from config import (
+    ORDEM_COLUNAS_FINAL, COLUNAS_ENTRADA_BASE, COLUNAS_SIMULACOES, TIPOS_CAMPANHA, TIMEOUT_RESTRICOES_S, VALIDADE_RESTRICOES_S,
+    INTERVALO_MIN_NOVA_BUSCA_S, INTERVALO_MAX_NOVA_BUSCA_S, DIRETORIO_RESTRICOES
+)
+from regras_convenio import colunas_regras
+
+def colunas_necessarias(convenio: Optional[str]) -> List[str]:
+    """
+    Projeção de colunas que as campanhas realmente utilizam: colunas finais, colunas de
+    pré-processamento/condição e as colunas referenciadas pelas regras do convênio.
+    As regras de todos os tipos de campanha entram (no máximo uma ou duas colunas a mais),
+    para que trocar o tipo de campanha não mude a chave do dataset nem exija reler a base.
+    """
+    colunas = ORDEM_COLUNAS_FINAL + COLUNAS_ENTRADA_BASE
+    for tipo_campanha in TIPOS_CAMPANHA:
+        colunas = colunas + colunas_regras(convenio, tipo_campanha)
+    return list(dict.fromkeys(colunas))
+
+def colunas_necessarias_simulacoes() -> List[str]:
+    """Projeção de colunas usada pelo Filtro Master."""
+    return list(dict.fromkeys(ORDEM_COLUNAS_FINAL + COLUNAS_ENTRADA_BASE + COLUNAS_SIMULACOES))
+
+def detectar_convenio(files: List[st.runtime.uploaded_file_manager.UploadedFile]) -> Optional[str]:
+    """
+    Lê apenas a primeira linha dos arquivos para descobrir o convênio antes do carregamento.
+    Usa só o início do buffer, tanto para uploads quanto para arquivos da pasta do servidor.
+    """
+    import csv
+    from leitor_csv import detectar_formato, TAMANHO_PREFIXO
+
+    for arquivo in files or []:
+        try:
+            prefixo = bytes(arquivo.getbuffer()[:TAMANHO_PREFIXO])
+            sep, encoding, cabecalho = detectar_formato(prefixo)
+            if 'Convenio' not in cabecalho:
+                continue
+            linhas = prefixo.decode(encoding, errors='ignore').splitlines()
+            valores = next(csv.reader(linhas[1:2], delimiter=sep), [])
+            posicao = cabecalho.index('Convenio')
+            if len(valores) > posicao and valores[posicao]:
+                return valores[posicao]
+        except Exception:
+            continue
+    return None
+
+# O carregamento é compartilhado pelo registro de datasets (ver `carregar_dataset`).
+def carregar_arquivos_csv(files: List[st.runtime.uploaded_file_manager.UploadedFile], colunas: Optional[List[str]] = None,
+                          deduplicacao: Optional[str] = None, coluna_margem: Optional[str] = None) -> pd.DataFrame:
+    """
+    Junta múltiplos arquivos CSV carregados em um único DataFrame.
+    Os arquivos são lidos em paralelo com o motor CSV do Arrow (ver `leitor_csv`).
+    Se `colunas` for informado, apenas essas colunas são lidas (ver `colunas_necessarias`).
+    Se `deduplicacao` for informado, CPF/Matrícula repetidos são resolvidos pela política
+    (ver `deduplicacao.deduplicar`) e o relatório por arquivo fica em `df.attrs['deduplicacao']`.
+    """
+    import numpy as np
+    from leitor_csv import ler_arquivos, concatenar
+
     if not files:
         st.warning("Nenhum arquivo CSV foi carregado.")
         return pd.DataFrame()
 
-    dataframes = []
-    for arquivo in files:
-        try:
-            # Garante que o ponteiro do arquivo esteja no início
-            arquivo.seek(0)
-            df = pd.read_csv(arquivo, low_memory=False)
-            if not df.empty:
-                dataframes.append(df)
-            else:
-                st.warning(f"O arquivo {arquivo.name} está vazio e será ignorado.")
-        except Exception as e:
-            st.error(f"Erro ao ler o arquivo {arquivo.name}: {e}")
-            
-    if not dataframes:
+    tabelas, erros = ler_arquivos(files, colunas)
+    for nome, erro in erros:
+        st.error(f"Erro ao ler o arquivo {nome}: {erro}")
+
+    tabelas_validas, nomes_validos = [], []
+    for nome, tabela in tabelas:
+        if tabela.num_rows > 0:
+            tabelas_validas.append(tabela)
+            nomes_validos.append(nome)
+        else:
+            st.warning(f"O arquivo {nome} está vazio e será ignorado.")
+
+    if not tabelas_validas:
         st.error("Nenhum arquivo CSV válido pôde ser processado.")
         return pd.DataFrame()
-        
-    return pd.concat(dataframes, ignore_index=True)
+
+    df = concatenar(tabelas_validas)
+    if deduplicacao:
+        from deduplicacao import deduplicar
+
+        # Arquivo de origem de cada linha (na ordem de carregamento)
+        origem = np.repeat(np.arange(len(tabelas_validas)), [t.num_rows for t in tabelas_validas])
+        df, relatorio = deduplicar(df, origem, nomes_validos, deduplicacao, coluna_margem)
+        df.attrs['deduplicacao'] = relatorio
+    return df
+
+# Impressões já calculadas por upload: o conteúdo só é lido novamente se os arquivos mudarem
+_impressoes_upload: Dict[tuple, str] = {}
+
+def impressao_arquivos(files: List[st.runtime.uploaded_file_manager.UploadedFile], colunas: Optional[List[str]] = None) -> str:
+    """Impressão digital do conteúdo dos arquivos carregados (e da projeção de colunas)."""
+    ids = tuple(getattr(arquivo, 'file_id', None) for arquivo in files or [])
+    chave_upload = (ids, repr(colunas)) if ids and None not in ids else None
+    if chave_upload in _impressoes_upload:
+        return _impressoes_upload[chave_upload]
+
+    h = hashlib.blake2b(digest_size=16)
+    for arquivo in files or []:
+        # Arquivos da pasta do servidor já trazem uma impressão (caminho, tamanho e data)
+        impressao_arquivo = getattr(arquivo, 'impressao', None)
+        h.update(impressao_arquivo.encode('utf-8') if impressao_arquivo else arquivo.getbuffer())
+        h.update(b'\x00')
+    h.update(repr(colunas).encode('utf-8'))
+    impressao = h.hexdigest()
+
+    if chave_upload is not None:
+        if len(_impressoes_upload) > 256:
+            _impressoes_upload.clear()
+        _impressoes_upload[chave_upload] = impressao
+    return impressao
+
+def _id_sessao() -> Optional[str]:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def _sessao_ativa(sessao: str) -> bool:
+    try:
+        return st.runtime.get_instance().is_active_session(sessao)
+    except Exception:
+        return True
+
+def carregar_dataset(files: List[st.runtime.uploaded_file_manager.UploadedFile], colunas: Optional[List[str]] = None,
+                     carregador=None, chave_sessao: str = 'dataset_chave', **opcoes):
+    """
+    Carrega a base pelo registro de datasets: cada conteúdo é lido uma única vez por processo
+    e as sessões recebem uma referência ao mesmo DataFrame (somente leitura).
+    A base anterior da sessão é liberada quando os arquivos mudam.
+    `opcoes` são repassadas ao carregador e fazem parte da chave.
+    Retorna a chave (hash do conteúdo) e o DataFrame.
+    """
+    carregador = carregador or carregar_arquivos_csv
+    chave = f"{carregador.__name__}:{impressao_arquivos(files, colunas)}"
+    if opcoes:
+        chave += ':' + hashlib.blake2b(repr(sorted(opcoes.items())).encode('utf-8'), digest_size=8).hexdigest()
+    sessao = _id_sessao()
+
+    anterior = st.session_state.get(chave_sessao)
+    if anterior and anterior != chave and sessao:
+        registro_datasets.liberar(anterior, sessao)
+
+    df = registro_datasets.obter_ou_carregar(chave, lambda: carregador(files, colunas, **opcoes), sessao)
+    st.session_state[chave_sessao] = chave
+    registro_datasets.despejar(_sessao_ativa)
+    return chave, df
+
+# Usa o cache de recursos: o perfil é calculado uma única vez por impressão digital do dataset.
+@st.cache_resource(max_entries=8)
+def obter_perfil(impressao: str, _df: pd.DataFrame) -> Dict:
+    """Retorna o perfil do dataset (valores distintos, nulos e estatísticas das margens)."""
+    return calcular_perfil(_df)
 
 # Usa o cache de recursos para criar o cliente Supabase apenas uma vez.
+# O cliente mantém uma única sessão HTTP (conexões reaproveitadas) para todas as consultas.
 @st.cache_resource
-def init_supabase_client() -> Client:
+def init_supabase_client() -> "Client":
     """Inicializa e retorna o cliente Supabase, lendo as credenciais do st.secrets."""
     try:
+        from supabase import create_client, ClientOptions
         url = st.secrets["supabase"]["url"]
         key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
+        return create_client(url, key, options=ClientOptions(postgrest_client_timeout=TIMEOUT_RESTRICOES_S))
     except Exception as e:
         st.error(f"Erro ao conectar com o Supabase. Verifique suas credenciais em st.secrets: {e}")
         return None
 
-# Usa o cache de dados para evitar buscar as mesmas restrições repetidamente.
-# A função agora será re-executada se o 'convenio' ou o 'produto' mudarem.
-@st.cache_data
-def buscar_restricoes(_supabase_client: Client, convenio: str, produto: str) -> Dict[str, List[str]]:
-    """
-    Busca restrições para um convênio e produto específicos no Supabase.
-    Busca tanto as regras do produto quanto as regras 'todos' (globais para o convênio).
-    """
-    restricoes = {
+# Mapeia o nome da campanha do Streamlit para o nome no DB para consistência
+_PRODUTO_DB = {
+    'Novo': 'novo', 
+    'Benefício': 'beneficio', 
+    'Cartão': 'cartao', 
+    'Benefício & Cartão': 'benef-cartao'
+}
+
+# Buscas de restrições por (convênio, produto): futuro, instante em que foi iniciada e se
+# alguém já esperou por ela até o limite. Uma busca concluída vale por VALIDADE_RESTRICOES_S.
+# Uma busca que falhou só é repetida depois de um intervalo que dobra a cada falha, e a última
+# resposta válida (em memória e em disco) é usada enquanto isso.
+_buscas_restricoes: Dict[tuple, dict] = {}
+_falhas_restricoes: Dict[tuple, dict] = {}
+_ultimas_restricoes: Dict[tuple, Dict[str, List[str]]] = {}
+_trava_restricoes = threading.RLock()
+_executor_restricoes = ThreadPoolExecutor(max_workers=4, thread_name_prefix='restricoes')
+
+def _restricoes_vazias() -> Dict[str, List[str]]:
+    return {
         "lotacao": [],
         "secretaria": [],
         "vinculo": []
     }
-    
-    if not _supabase_client or not convenio or not produto:
-        return restricoes
-
-    # Mapeia o nome da campanha do Streamlit para o nome no DB para consistência
-    produto_map = {
-        'Novo': 'novo', 
-        'Benefício': 'beneficio', 
-        'Cartão': 'cartao', 
-        'Benefício & Cartão': 'benef-cartao'
-    }
-    produto_db = produto_map.get(produto, produto.lower())
 
-    try:
-        # A consulta busca pelo convênio E por produtos ('específico' OU 'todos')
-        query = _supabase_client.table("restricoes") \
-            .select("tipo_restricao, valor_restrito") \
-            .eq("convenio", convenio) \
-            .in_("produto", [produto_db, 'todos'])
-            
-        data = query.execute().data
+def _consultar_restricoes(supabase_client: "Client", convenio: str, produto_db: str) -> Dict[str, List[str]]:
+    """
+    Consulta as restrições no Supabase (roda na thread de busca; erros são propagados).
+    Busca tanto as regras do produto quanto as regras 'todos' (globais para o convênio).
+    """
+    restricoes = _restricoes_vazias()
+
+    # A consulta busca pelo convênio E por produtos ('específico' OU 'todos')
+    query = supabase_client.table("restricoes") \
+        .select("tipo_restricao, valor_restrito") \
+        .eq("convenio", convenio) \
+        .in_("produto", [produto_db, 'todos'])
         
-        if data:
-            for item in data:
-                tipo = item['tipo_restricao']
-                valor = item['valor_restrito']
-                
-                # Adiciona na lista correspondente se o tipo for conhecido
-                if tipo in restricoes:
-                    if valor not in restricoes[tipo]: # Evita adicionar valores duplicados
-                        restricoes[tipo].append(valor)
+    data = query.execute().data
+    
+    for item in data or []:
+        tipo = item['tipo_restricao']
+        valor = item['valor_restrito']
         
-        return restricoes
+        # Adiciona na lista correspondente se o tipo for conhecido
+        if tipo in restricoes:
+            if valor not in restricoes[tipo]: # Evita adicionar valores duplicados
+                restricoes[tipo].append(valor)
+    
+    return restricoes
+
+def _arquivo_restricoes(chave: tuple) -> Path:
+    nome = hashlib.blake2b(repr(chave).encode('utf-8'), digest_size=8).hexdigest()
+    return Path(DIRETORIO_RESTRICOES) / f"{nome}.json"
+
+def _salvar_restricoes(chave: tuple, restricoes: Dict[str, List[str]]) -> None:
+    """Grava a última resposta válida, para que sobreviva a um reinício do processo."""
+    caminho = _arquivo_restricoes(chave)
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix('.tmp')
+        temporario.write_text(json.dumps({
+            'convenio': chave[0],
+            'produto': chave[1],
+            'obtidas_em': datetime.now().isoformat(timespec='seconds'),
+            'restricoes': restricoes,
+        }, ensure_ascii=False), encoding='utf-8')
+        os.replace(temporario, caminho)
+    except OSError:
+        pass
+
+def _restricoes_salvas(chave: tuple) -> Optional[dict]:
+    """Última resposta válida gravada em disco (restrições e data), se houver."""
+    try:
+        return json.loads(_arquivo_restricoes(chave).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+def _registrar_busca(chave: tuple, futuro) -> None:
+    """Ao fim de uma busca: guarda a resposta válida ou agenda a próxima tentativa."""
+    if futuro.cancelled():
+        return
+    erro = futuro.exception()
+    with _trava_restricoes:
+        if erro is None:
+            _ultimas_restricoes[chave] = futuro.result()
+            _falhas_restricoes.pop(chave, None)
+        else:
+            tentativas = _falhas_restricoes.get(chave, {}).get('tentativas', 0) + 1
+            intervalo = min(INTERVALO_MIN_NOVA_BUSCA_S * 2 ** (tentativas - 1), INTERVALO_MAX_NOVA_BUSCA_S)
+            _falhas_restricoes[chave] = {
+                'tentativas': tentativas,
+                'proxima': time.monotonic() + intervalo,
+                'erro': erro,
+            }
+    if erro is None:
+        _salvar_restricoes(chave, futuro.result())
 
+def iniciar_busca_restricoes(supabase_client: "Client", convenio: Optional[str], produto: Optional[str]) -> None:
+    """
+    Dispara a busca das restrições em segundo plano, para que a espera pela rede
+    aconteça em paralelo com a leitura dos arquivos. Não faz nada se já houver uma
+    busca em andamento, uma resposta ainda válida para o mesmo convênio e produto ou
+    uma falha recente (antes do intervalo para a próxima tentativa).
+    """
+    if not supabase_client or not convenio or not produto:
+        return
+    chave = (convenio, _PRODUTO_DB.get(produto, produto.lower()))
+    with _trava_restricoes:
+        busca = _buscas_restricoes.get(chave)
+        if busca is not None:
+            futuro = busca['futuro']
+            if not futuro.done():
+                return
+            if futuro.exception() is None:
+                if time.monotonic() - busca['inicio'] < VALIDADE_RESTRICOES_S:
+                    return
+            elif time.monotonic() < _falhas_restricoes.get(chave, {}).get('proxima', 0):
+                return
+        futuro = _executor_restricoes.submit(_consultar_restricoes, supabase_client, *chave)
+        _buscas_restricoes[chave] = {'futuro': futuro, 'inicio': time.monotonic(), 'esperada': False}
+        futuro.add_done_callback(lambda f: _registrar_busca(chave, f))
+
+def buscar_restricoes(_supabase_client: "Client", convenio: str, produto: str) -> Dict[str, List[str]]:
+    """
+    Retorna as restrições de um convênio e produto da busca em segundo plano (iniciada aqui
+    se ainda não existir). Só a primeira espera por uma busca, sem resposta anterior em
+    memória, dura até TIMEOUT_RESTRICOES_S segundos; nas demais execuções da página a
+    busca em andamento não bloqueia. Enquanto não há resposta nova, usa a última resposta
+    válida (em memória ou, após um reinício, a gravada em disco); sem ela, avisa com um
+    erro que nenhuma restrição será aplicada.
+    """
+    if not _supabase_client or not convenio or not produto:
+        return _restricoes_vazias()
+
+    iniciar_busca_restricoes(_supabase_client, convenio, produto)
+    chave = (convenio, _PRODUTO_DB.get(produto, produto.lower()))
+    with _trava_restricoes:
+        busca = _buscas_restricoes[chave]
+        ultimas = _ultimas_restricoes.get(chave)
+        falha = _falhas_restricoes.get(chave)
+    esperar = not busca['esperada'] and ultimas is None
+
+    motivo = None
+    try:
+        restricoes = busca['futuro'].result(timeout=TIMEOUT_RESTRICOES_S if esperar else 0)
+        with _trava_restricoes:
+            _ultimas_restricoes[chave] = restricoes
+    except FuturesTimeoutError:
+        busca['esperada'] = True
+        if falha is not None:
+            motivo = f"Não foi possível buscar restrições para '{convenio}/{produto}': {falha['erro']}"
+        elif ultimas is None:
+            motivo = f"A busca de restrições para '{convenio}/{produto}' excedeu {TIMEOUT_RESTRICOES_S}s"
+        restricoes = ultimas
     except Exception as e:
-        st.warning(f"Não foi possível buscar restrições para '{convenio}/{produto}': {e}")
-        return restricoes
+        motivo = f"Não foi possível buscar restrições para '{convenio}/{produto}': {e}"
+        restricoes = ultimas
+
+    if restricoes is None:
+        salvas = _restricoes_salvas(chave)
+        if salvas is not None:
+            obtidas_em = datetime.fromisoformat(salvas['obtidas_em'])
+            st.warning(f"{motivo}; usando as restrições salvas em {obtidas_em:%d/%m/%Y %H:%M}.")
+            restricoes = salvas['restricoes']
+        else:
+            st.error(f"{motivo}. Não há restrições carregadas anteriormente: nenhuma restrição será aplicada.")
+            restricoes = _restricoes_vazias()
+    elif motivo:
+        st.warning(f"{motivo}; usando as últimas restrições carregadas.")
+    # Cópia: a resposta é compartilhada entre sessões
+    return {tipo: list(valores) for tipo, valores in restricoes.items()}
+
+def ler_lista_cpfs(arquivo: st.runtime.uploaded_file_manager.UploadedFile) -> pd.Series:
+    """Lê os CPFs de uma lista de supressão (coluna 'CPF' ou, na falta dela, a primeira coluna)."""
+    import pyarrow as pa
+    from leitor_csv import ler_buffer
+
+    tabela = ler_buffer(pa.py_buffer(arquivo.getbuffer()), todas_texto=True)
+    coluna = 'CPF' if 'CPF' in tabela.column_names else tabela.column_names[0]
+    return tabela.column(coluna).to_pandas()
 
 def converter_df_para_csv(df: pd.DataFrame) -> bytes:
     """Converte um DataFrame para CSV em formato UTF-8, pronto para download."""
@@ -103,32 +374,21 @@ def converter_df_para_csv(df: pd.DataFrame) -> bytes:
 # ===========================================================================
 # Filtro Master - 
 
-import io
+def carregar_arquivos_simulacoes(files: List[st.runtime.uploaded_file_manager.UploadedFile], colunas: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Carrega arquivos de simulação (todas as colunas como texto), detectando o separador.
+    Arquivos sem UTF-8 evidente no início são lidos como latin1.
+    """
+    from leitor_csv import ler_arquivos, concatenar
 
-@st.cache_data
-def carregar_arquivos_simulacoes(files: List[st.runtime.uploaded_file_manager.UploadedFile]) -> pd.DataFrame:
-    """Carrega arquivos de simulação, detectando o separador e usando codificação latin1."""
     if not files:
         return pd.DataFrame()
 
-    lista_dfs = []
-    for file in files:
-        try:
-            file.seek(0)
-            content_bytes = file.read()
-            
-            # Detecta o separador (vírgula ou ponto e vírgula)
-            primeira_linha = content_bytes.splitlines()[0].decode('latin1')
-            sep = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
-            
-            file_buffer = io.BytesIO(content_bytes)
-            df = pd.read_csv(file_buffer, sep=sep, encoding='latin1', low_memory=False, dtype=str)
-            lista_dfs.append(df)
-        except Exception as e:
-            st.error(f"Não foi possível ler o arquivo {file.name}. Erro: {e}")
-            continue
-    
-    if not lista_dfs:
+    tabelas, erros = ler_arquivos(files, colunas, todas_texto=True, encoding_padrao='latin1')
+    for nome, erro in erros:
+        st.error(f"Não foi possível ler o arquivo {nome}. Erro: {erro}")
+
+    if not tabelas:
         return pd.DataFrame()
 
-    return pd.concat(lista_dfs, ignore_index=True)
\ No newline at end of file
+    return concatenar([tabela for _, tabela in tabelas])
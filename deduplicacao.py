@@ -0,0 +1,107 @@
+# deduplicacao.py
+"""
+Deduplicação entre arquivos de higienização no carregamento.
+
+Cada linha recebe uma chave de hash (CPF normalizado + Matrícula) e as linhas
+repetidas são resolvidas por uma política configurável antes de qualquer cálculo.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from supressao import normalizar_cpfs
+
+COLUNAS_TELEFONE = ['FONE1', 'FONE2', 'FONE3', 'FONE4']
+
+
+def chave_registro(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash (uint64) de CPF normalizado + Matrícula para cada linha.
+    Linhas sem CPF válido ou sem Matrícula recebem uma chave própria (pela posição)
+    e nunca são agrupadas com outras.
+    """
+    partes = {}
+    faltando = np.zeros(len(df), dtype=bool)
+    if 'CPF' in df.columns:
+        partes['CPF'] = normalizar_cpfs(df['CPF'])
+        faltando |= partes['CPF'] < 0
+    if 'Matricula' in df.columns:
+        partes['Matricula'] = pd.factorize(df['Matricula'])[0]
+        faltando |= partes['Matricula'] < 0
+    if not partes:
+        return np.arange(len(df), dtype=np.uint64)
+    partes['linha'] = np.where(faltando, np.arange(len(df)), -1)
+    return pd.util.hash_pandas_object(pd.DataFrame(partes), index=False).to_numpy()
+
+
+def _mesclar_telefones(df: pd.DataFrame, chaves: np.ndarray, manter: np.ndarray) -> pd.DataFrame:
+    """Preenche os telefones da linha mantida com os telefones distintos das duplicatas."""
+    colunas = [c for c in COLUNAS_TELEFONE if c in df.columns]
+    repetidas = pd.Series(chaves).duplicated(keep=False).to_numpy()
+    if not colunas or not repetidas.any():
+        return df
+
+    # Formato longo: as linhas mais recentes (e as primeiras colunas) têm prioridade
+    posicoes = np.flatnonzero(repetidas)[::-1]
+    longo = pd.DataFrame({
+        'chave': np.repeat(chaves[posicoes], len(colunas)),
+        'fone': df[colunas].iloc[posicoes].to_numpy().ravel(),
+    }).dropna(subset=['fone'])
+    longo = longo.drop_duplicates()
+    longo['ordem'] = longo.groupby('chave', sort=False).cumcount()
+    longo = longo[longo['ordem'] < len(colunas)]
+    telefones = longo.pivot(index='chave', columns='ordem', values='fone')
+
+    alvo = np.flatnonzero(repetidas & manter)
+    mesclados = telefones.reindex(chaves[alvo])
+    df = df.copy()
+    for i, coluna in enumerate(colunas):
+        valores = mesclados[i] if i in mesclados.columns else pd.Series(np.nan, index=mesclados.index)
+        serie = df[coluna].copy()
+        try:
+            serie.iloc[alvo] = valores.to_numpy()
+        except (TypeError, ValueError):
+            # Telefones de tipos diferentes entre os arquivos: mantém como objeto
+            serie = serie.astype(object)
+            serie.iloc[alvo] = valores.to_numpy()
+        df[coluna] = serie
+    return df
+
+
+def deduplicar(df: pd.DataFrame, origem: np.ndarray, nomes_arquivos: List[str], politica: Optional[str],
+               coluna_margem: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Dict[str, int]]]:
+    """
+    Remove registros repetidos (mesmo CPF e Matrícula) segundo a política:
+    - 'mais_recente': mantém a linha do último arquivo carregado;
+    - 'maior_margem': mantém a linha com a maior `coluna_margem`;
+    - 'mesclar_telefones': mantém a linha mais recente, completando os telefones com os das demais.
+    `origem` indica o arquivo (posição em `nomes_arquivos`) de cada linha.
+    Retorna a base e, por arquivo, quantas linhas eram duplicadas e quantas foram removidas.
+    """
+    if not politica or df.empty:
+        return df, {}
+
+    chaves = chave_registro(df)
+    serie_chaves = pd.Series(chaves)
+    repetidas = serie_chaves.duplicated(keep=False).to_numpy()
+
+    if politica == 'maior_margem' and coluna_margem in df.columns:
+        margem = pd.to_numeric(df[coluna_margem], errors='coerce').fillna(-np.inf).reset_index(drop=True)
+        maximo = margem.groupby(chaves, sort=False).transform('max')
+        candidatas = (margem == maximo).to_numpy()
+        manter = candidatas & ~pd.Series(np.where(candidatas, chaves, 0)).duplicated().to_numpy() | ~repetidas
+    else:
+        manter = ~serie_chaves.duplicated(keep='last').to_numpy()
+
+    if politica == 'mesclar_telefones':
+        df = _mesclar_telefones(df, chaves, manter)
+
+    relatorio = {}
+    for i, nome in enumerate(nomes_arquivos):
+        do_arquivo = origem == i
+        contagem = relatorio.setdefault(nome, {'duplicados': 0, 'removidos': 0})
+        contagem['duplicados'] += int((repetidas & do_arquivo).sum())
+        contagem['removidos'] += int((~manter & do_arquivo).sum())
+    return df.loc[manter].reset_index(drop=True), relatorio
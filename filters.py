@@ -6,39 +6,56 @@ Contém toda a lógica de filtragem.
 import pandas as pd
 from datetime import datetime
 from config import ORDEM_COLUNAS_FINAL, MAPEAMENTO_COLUNAS_FINAL
+from supressao import mascara_suprimidos, normalizar_cpfs
+from particionamento import atribuir_equipes
+from regras_convenio import compilar_regras, aplicar_etapas, preparar_casos, caso_aplicavel, mascara_matriculas
+from calculo_valores import calcular_valores
 import re
 import numpy as np
 
+# Produtos calculados e (coluna de ordenação, colunas de banco) de cada campanha
+_PRODUTOS_CAMPANHA = {
+    'Novo': ['emprestimo'],
+    'Benefício': ['beneficio'],
+    'Cartão': ['cartao'],
+    'Benefício & Cartão': ['beneficio', 'cartao'],
+}
+_ORDEM_CAMPANHA = {
+    'Novo': ('valor_liberado_emprestimo', ['banco_emprestimo']),
+    'Benefício': ('valor_liberado_beneficio', ['banco_beneficio']),
+    'Cartão': ('valor_liberado_cartao', ['banco_cartao']),
+    'Benefício & Cartão': ('comissao_total', ['banco_beneficio', 'banco_cartao']),
+}
+
 # Função Auxiliar de Margem de Segurança
-def _aplicar_margem_seguranca(margem_disponivel_series: pd.Series, config: dict) -> pd.Series:
+def _parametros_margem_seguranca(config: dict) -> tuple:
     """
-    Aplica a margem de segurança a uma Série de margens com base na configuração.
-    Retorna a Série com as margens ajustadas.
+    Margem de segurança da configuração como (fator, subtrair, piso):
+    a margem ajustada é max(margem * fator - subtrair, piso).
     """
+    sem_ajuste = (1.0, 0.0, -np.inf)
     if not config.get("usa_margem_seguranca"):
-        return margem_disponivel_series
+        return sem_ajuste
 
     modo = config.get("modo_margem_seguranca")
     valor = config.get("valor_margem_seguranca", 0)
 
     if modo == "Percentual (%)":
-        fator = 1 - (valor / 100)
-        return margem_disponivel_series * fator
+        return (1 - (valor / 100), 0.0, -np.inf)
     
     elif modo == "Valor Fixo (R$)":
-        margem_ajustada = margem_disponivel_series - valor
-        return margem_ajustada.clip(lower=0)
+        return (1.0, valor, 0.0)
     
-    return margem_disponivel_series
+    return sem_ajuste
 
 # Função Auxiliar de Máscara Condicional (VERSÃO ÚNICA E CORRETA)
-def _criar_mascara_condicional(base, config, coluna_tratado):
-    """Função utilitária para criar a máscara de filtro de forma padronizada."""
+def _mascara_condicao(base, config):
+    """Máscara da condição da configuração (coluna/valor), sem considerar linhas já tratadas."""
     coluna_condicional = config.get('coluna_condicional')
     valor_condicional = config.get('valor_condicional')
     modo_condicional = config.get('modo_condicional')
 
-    mascara = ~base[coluna_tratado]
+    mascara = pd.Series(True, index=base.index)
 
     if coluna_condicional != "Aplicar a toda a base":
         if coluna_condicional in base.columns and base[coluna_condicional].notna().any() and valor_condicional:
@@ -51,6 +68,10 @@ def _criar_mascara_condicional(base, config, coluna_tratado):
                 mascara &= (base[coluna_condicional] == valor_condicional)
     return mascara
 
+def _criar_mascara_condicional(base, config, coluna_tratado):
+    """Função utilitária para criar a máscara de filtro de forma padronizada."""
+    return ~base[coluna_tratado] & _mascara_condicao(base, config)
+
 
 def _preprocessar_base(df: pd.DataFrame, params: dict) -> pd.DataFrame:
     """Aplica filtros e limpezas comuns a todas as campanhas."""
@@ -61,7 +82,12 @@ def _preprocessar_base(df: pd.DataFrame, params: dict) -> pd.DataFrame:
             lambda x: x.title() if isinstance(x, str) else x
         )
     if 'CPF' in base.columns:
-        base['CPF'] = base['CPF'].str.replace(r"[.\-]", "", regex=True)
+        if pd.api.types.is_numeric_dtype(base['CPF']):
+            # CPF só com dígitos e alguma célula vazia é lido como número: volta ao texto de 11 dígitos
+            cpfs = normalizar_cpfs(base['CPF'])
+            base['CPF'] = pd.Series(cpfs, index=base.index).astype(str).str.zfill(11).where(cpfs >= 0)
+        else:
+            base['CPF'] = base['CPF'].str.replace(r"[.\-]", "", regex=True)
 
     if params.get('selecao_lotacao'):
         base = base[~base['Lotacao'].isin(params['selecao_lotacao'])]
@@ -76,208 +102,154 @@ def _preprocessar_base(df: pd.DataFrame, params: dict) -> pd.DataFrame:
     return base
 
 
-def _calcular_novo(base: pd.DataFrame, params: dict, configs_banco: list) -> pd.DataFrame: 
-    convenio = params['convenio']
-    if convenio == 'govsp':
-        negativos = base.loc[base['MG_Emprestimo_Disponivel'] < 0, 'Matricula']
-        base = base.loc[~base['Matricula'].isin(negativos)]
-    elif convenio == 'govmt':
-        base = base.loc[base['MG_Compulsoria_Disponivel'] >= 0]
-        
-    """Lógica de cálculo específica para a campanha 'Novo'."""
-    base = base.loc[base['MG_Emprestimo_Disponivel'] >= params.get('margem_limite', 0)]
-    
-    base['tratado'] = False
-    for config in configs_banco:
-        mask = _criar_mascara_condicional(base, config, 'tratado')
-        margem_disponivel = base.loc[mask, 'MG_Emprestimo_Disponivel']
-        margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-        base.loc[mask, 'valor_liberado_emprestimo'] = (margem_ajustada * config.get('coeficiente', 0)).round(2)
-        base.loc[mask, 'valor_parcela_emprestimo'] = margem_ajustada.round(2)
-        base.loc[mask, 'comissao_emprestimo'] = (base.loc[mask, 'valor_liberado_emprestimo'] * (config.get('comissao', 0) / 100)).round(2)
-        base.loc[mask, 'banco_emprestimo'] = config.get('banco')
-        base.loc[mask, 'prazo_emprestimo'] = config.get('parcelas')
-        base.loc[mask, 'tratado'] = True
-    if 'comissao_emprestimo' in base.columns:
-        base = base.loc[base['comissao_emprestimo'] >= params.get('comissao_minima', 0)]
-    return base
+def _remover_suprimidos(base: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """Remove os CPFs da lista de supressão da equipe, se a etapa estiver ativada."""
+    if not params.get('aplicar_supressao') or 'CPF' not in base.columns:
+        return base
+    return base.loc[~mascara_suprimidos(base['CPF'], params.get('equipe'))]
 
-def _calcular_beneficio(base: pd.DataFrame, params: dict, configs_banco: list) -> pd.DataFrame:
-    convenio = params['convenio']
-    usou_beneficio = pd.Series(dtype='object')
-    if convenio == 'govsp':
-        base['margem_beneficio_usado'] = base['MG_Beneficio_Saque_Total'] - base['MG_Beneficio_Saque_Disponivel']
-        usou_beneficio = base.loc[base['margem_beneficio_usado'] > 0]
-        base = base.loc[base['MG_Beneficio_Saque_Disponivel'] == base['MG_Beneficio_Saque_Total']]
-        base = base[base['Lotacao'] != "ALESP"]
-    conv_excluidos = ['prefrj', 'govpi', 'goval', 'govce']
-    if convenio not in conv_excluidos:
-        base = base.loc[base['MG_Beneficio_Saque_Disponivel'] == base['MG_Beneficio_Saque_Total']]
-    
-    """Lógica de cálculo específica para a campanha 'Benefício'."""
-    base = base.loc[base['MG_Emprestimo_Disponivel'] < params.get('margem_limite', 999999)]
-    
-    base = base.sort_values(by='MG_Beneficio_Saque_Disponivel', ascending=False)
-    base['tratado'] = False
-    for config in configs_banco:
-        coeficiente = config.get('coeficiente', 0)
-        coeficiente2 = config.get('coeficiente2')
-        mask = _criar_mascara_condicional(base, config, 'tratado')
-        if convenio == 'goval':
-            condicao_adicional = (base['MG_Beneficio_Saque_Disponivel'] == base['MG_Beneficio_Saque_Total']) & (base['MG_Beneficio_Compra_Disponivel'] == base['MG_Beneficio_Compra_Total'])
-            margem_a_ser_usada = base['MG_Beneficio_Saque_Disponivel'].copy()
-            coeficiente_a_ser_usado = pd.Series(coeficiente2, index=base.index)
-            margem_a_ser_usada.loc[condicao_adicional] += base.loc[condicao_adicional, 'MG_Beneficio_Compra_Disponivel']
-            coeficiente_a_ser_usado.loc[condicao_adicional] = coeficiente
-            margem_ajustada = _aplicar_margem_seguranca(margem_a_ser_usada[mask], config)
-            base.loc[mask, "valor_liberado_beneficio"] = (margem_ajustada * coeficiente_a_ser_usado[mask]).round(2)
-        elif convenio == 'govam':
-            usar_margem_compra = config.get('usar_margem_compra', False)
-            if usar_margem_compra:
-                mask_govam = mask & (base['MG_Beneficio_Compra_Total'] == base['MG_Beneficio_Compra_Disponivel']) & (base['MG_Beneficio_Saque_Total'] == base['MG_Beneficio_Saque_Disponivel'])
-                margem_disponivel = base.loc[mask_govam, 'MG_Beneficio_Compra_Disponivel']
-                margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-                base.loc[mask_govam, 'valor_liberado_beneficio'] = (margem_ajustada * coeficiente).round(2)
-            else:
-                mask_govam = mask & (base['MG_Beneficio_Compra_Total'] != base['MG_Beneficio_Compra_Disponivel']) & (base['MG_Beneficio_Saque_Total'] == base['MG_Beneficio_Saque_Disponivel'])
-                margem_disponivel = base.loc[mask_govam, 'MG_Beneficio_Saque_Disponivel']
-                margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-                base.loc[mask_govam, 'valor_liberado_beneficio'] = (margem_ajustada * coeficiente).round(2)
-        elif convenio == 'govsp':
-            margem_disponivel = base.loc[mask, 'MG_Beneficio_Saque_Disponivel']
-            margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-            base.loc[mask, 'valor_liberado_beneficio'] = (margem_ajustada * coeficiente).round(2)
-            if not usou_beneficio.empty:
-                base.loc[base['Matricula'].isin(usou_beneficio['Matricula']), 'valor_liberado_beneficio'] = 0
-        else:
-            margem_disponivel = base.loc[mask, 'MG_Beneficio_Saque_Disponivel']
-            margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-            base.loc[mask, 'valor_liberado_beneficio'] = (margem_ajustada * coeficiente).round(2)
-        base.loc[mask, 'valor_parcela_beneficio'] = (base.loc[mask, 'valor_liberado_beneficio'] / config.get('coeficiente_parcela', 1.0)).round(2)
-        base.loc[mask, 'comissao_beneficio'] = (base.loc[mask, 'valor_liberado_beneficio'] * (config.get('comissao', 0) / 100)).round(2)
-        base.loc[mask, 'banco_beneficio'] = config.get('banco')
-        base.loc[mask, 'prazo_beneficio'] = config.get('parcelas')
-        base.loc[mask, 'tratado'] = True
-    if 'comissao_beneficio' in base.columns:
-        base = base.loc[base['comissao_beneficio'] >= params.get('comissao_minima', 0)]
-    return base
 
-def _calcular_cartao(base: pd.DataFrame, params: dict, configs_banco: list) -> pd.DataFrame:
-    convenio = params['convenio']
-    usou_cartao = pd.Series(dtype='object')
-    
-    if convenio == 'govsp':
-        base = base[base['Lotacao'] != "ALESP"]
-        base['margem_cartao_usado'] = base['MG_Cartao_Total'] - base['MG_Cartao_Disponivel']
-        usou_cartao = base.loc[base['margem_cartao_usado'] > 0]
-        
-    base = base.loc[base['MG_Emprestimo_Disponivel'] < params.get('margem_limite', 999999)]
-    base['tratado'] = False
-    for config in configs_banco:
-        mask = _criar_mascara_condicional(base, config, 'tratado')
-        
-        # Lógica da nova regra do cartão consignado
-        filtro_margem_cartao_igual = base.loc[mask, 'MG_Cartao_Total'] == base.loc[mask, 'MG_Cartao_Disponivel']
-        
-        margem_disponivel = base.loc[mask, 'MG_Cartao_Disponivel']
-        margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-        
-        valor_calculado = (margem_ajustada * config.get('coeficiente', 0)).round(2)
-        
-        # Aplica a regra: valor é zero se as margens não forem iguais
-        base.loc[mask, 'valor_liberado_cartao'] = np.where(filtro_margem_cartao_igual, valor_calculado, 0)
-
-        if convenio == 'govsp' and not usou_cartao.empty:
-            base.loc[base['Matricula'].isin(usou_cartao['Matricula']), 'valor_liberado_cartao'] = 0
-            
-        base.loc[mask, 'valor_parcela_cartao'] = (base.loc[mask, 'valor_liberado_cartao'] / config.get('coeficiente_parcela', 1.0)).round(2)
-        base.loc[mask, 'comissao_cartao'] = (base.loc[mask, 'valor_liberado_cartao'] * (config.get('comissao', 0) / 100)).round(2)
-        base.loc[mask, 'banco_cartao'] = config.get('banco')
-        base.loc[mask, 'prazo_cartao'] = config.get('parcelas')
-        base.loc[mask, 'tratado'] = True
-        
-    if 'comissao_cartao' in base.columns:
-        base = base.loc[base['comissao_cartao'] >= params.get('comissao_minima', 0)]
-    return base
+def _calcular_produto(base: pd.DataFrame, casos: list, zerar, configs_banco: list, produto: str,
+                      bancos: list, vazio: float = np.nan) -> dict:
+    """
+    Aplica as configurações de banco, em ordem, às linhas ainda não tratadas de um produto.
+    O laço das configurações só decide a regra (configuração + caso de margem) de cada linha;
+    valor liberado, parcela e comissão são calculados depois, numa única passada
+    (ver `calculo_valores.calcular_valores`).
+    Retorna arrays do tamanho da base; `banco` guarda o código em `bancos` (0 = não tratado).
+    """
+    n = len(base)
+    resultado = {
+        'banco': np.zeros(n, dtype=np.int8),
+        'prazo': np.full(n, vazio),
+        'tratado': np.zeros(n, dtype=bool),
+    }
+    regra = np.zeros(n, dtype=np.int16)
+    caso_linha = np.zeros(n, dtype=np.int8)
+    # Regra 0: linhas sem cálculo (não tratadas ou sem caso de margem aplicável)
+    parametros = {'fator': [1.0], 'subtrair': [0.0], 'piso': [-np.inf], 'coeficiente': [1.0],
+                  'coeficiente_parcela': [1.0], 'comissao': [1.0]}
 
-def _calcular_beneficio_e_cartao(base: pd.DataFrame, params: dict, configs_banco: list) -> pd.DataFrame:
-    convenio = params['convenio']
-    base['valor_liberado_beneficio'] = 0.0
-    base['valor_liberado_cartao'] = 0.0
-    base['comissao_beneficio'] = 0.0
-    base['comissao_cartao'] = 0.0
-    base['valor_parcela_beneficio'] = 0.0
-    base['valor_parcela_cartao'] = 0.0
-    base['banco_beneficio'] = ''
-    base['banco_cartao'] = ''
-    base['prazo_beneficio'] = 0
-    base['prazo_cartao'] = 0
-    base['tratado_beneficio'] = False
-    base['tratado_cartao'] = False
-    usou_beneficio, usou_cartao = pd.Series(dtype='object'), pd.Series(dtype='object')
-    if convenio == 'govsp':
-        base = base[base['Lotacao'] != 'ALESP']
-        usou_beneficio = base[base['MG_Beneficio_Saque_Total'] > base['MG_Beneficio_Saque_Disponivel']]
-        usou_cartao = base[base['MG_Cartao_Total'] > base['MG_Cartao_Disponivel']]
-        
-    """Lógica de cálculo para a campanha 'Benefício & Cartão', com todas as regras de negócio."""
-    base = base.loc[base['MG_Emprestimo_Disponivel'] < params.get('margem_limite', 999999)]
-    
     for config in configs_banco:
-        produto = config.get('cartao_escolhido')
-        
-        if produto == 'Benefício':
-            mask = _criar_mascara_condicional(base, config, 'tratado_beneficio')
-            if convenio == 'goval':
-                coeficiente = config.get('coeficiente', 0)
-                coeficiente2 = config.get('coeficiente2')
-                condicao_adicional = (base['MG_Beneficio_Saque_Disponivel'] == base['MG_Beneficio_Saque_Total']) & (base['MG_Beneficio_Compra_Disponivel'] == base['MG_Beneficio_Compra_Total'])
-                margem_a_ser_usada = base['MG_Beneficio_Saque_Disponivel'].copy()
-                coeficiente_a_ser_usado = pd.Series(coeficiente2, index=base.index)
-                margem_a_ser_usada.loc[condicao_adicional] += base.loc[condicao_adicional, 'MG_Beneficio_Compra_Disponivel']
-                coeficiente_a_ser_usado.loc[condicao_adicional] = coeficiente
-                margem_ajustada = _aplicar_margem_seguranca(margem_a_ser_usada[mask], config)
-                base.loc[mask, "valor_liberado_beneficio"] = (margem_ajustada * coeficiente_a_ser_usado[mask]).round(2)
-            else:
-                margem_disponivel = base.loc[mask, 'MG_Beneficio_Saque_Disponivel']
-                margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-                base.loc[mask, 'valor_liberado_beneficio'] = (margem_ajustada * config.get('coeficiente', 0)).round(2)
-                if convenio == 'govsp' and not usou_beneficio.empty:
-                    base.loc[base['Matricula'].isin(usou_beneficio['Matricula']), 'valor_liberado_beneficio'] = 0
-            base.loc[mask, 'valor_parcela_beneficio'] = (base.loc[mask, 'valor_liberado_beneficio'] / config.get('coeficiente_parcela', 1.0)).round(2)
-            base.loc[mask, 'comissao_beneficio'] = (base.loc[mask, 'valor_liberado_beneficio'] * (config.get('comissao', 0) / 100)).round(2)
-            base.loc[mask, 'banco_beneficio'] = config.get('banco')
-            base.loc[mask, 'prazo_beneficio'] = config.get('parcelas')
-            base.loc[mask, 'tratado_beneficio'] = True
-            
-        elif produto == 'Consignado':
-            mask = _criar_mascara_condicional(base, config, 'tratado_cartao')
-            
-            # --- INÍCIO DA CORREÇÃO ---
-            # 1. Cria o filtro para a nova regra de negócio (apenas nas linhas da máscara)
-            filtro_margem_cartao_igual = base.loc[mask, 'MG_Cartao_Total'] == base.loc[mask, 'MG_Cartao_Disponivel']
-            
-            # 2. Calcula o valor liberado normalmente
-            margem_disponivel = base.loc[mask, 'MG_Cartao_Disponivel']
-            margem_ajustada = _aplicar_margem_seguranca(margem_disponivel, config)
-            valor_calculado = (margem_ajustada * config.get('coeficiente', 0)).round(2)
-
-            # 3. Usa np.where para aplicar a regra: se a condição for True, usa o valor_calculado, senão, usa 0.
-            base.loc[mask, 'valor_liberado_cartao'] = np.where(filtro_margem_cartao_igual, valor_calculado, 0)
-            # --- FIM DA CORREÇÃO ---
-
-            if convenio == 'govsp' and not usou_cartao.empty:
-                 base.loc[base['Matricula'].isin(usou_cartao['Matricula']), 'valor_liberado_cartao'] = 0
-            
-            base.loc[mask, 'valor_parcela_cartao'] = (base.loc[mask, 'valor_liberado_cartao'] / config.get('coeficiente_parcela', 1.0)).round(2)
-            base.loc[mask, 'comissao_cartao'] = (base.loc[mask, 'valor_liberado_cartao'] * (config.get('comissao', 0) / 100)).round(2)
-            base.loc[mask, 'banco_cartao'] = config.get('banco')
-            base.loc[mask, 'prazo_cartao'] = config.get('parcelas')
-            base.loc[mask, 'tratado_cartao'] = True
-    
-    base['comissao_total'] = (base['comissao_beneficio'] + base['comissao_cartao']).round(2)
-    base = base[base['comissao_total'] >= params.get('comissao_minima', 0)]
-    return base
+        mask = ~resultado['tratado'] & _mascara_condicao(base, config).to_numpy()
+        fator, subtrair, piso = _parametros_margem_seguranca(config)
+
+        # Cada linha usa o primeiro caso de margem aplicável; sem caso, fica sem valor
+        restantes = mask.copy()
+        for indice, caso in enumerate(casos, start=1):
+            if not caso_aplicavel(caso, config):
+                continue
+            linhas = restantes & caso['quando'] if caso['quando'] is not None else restantes.copy()
+            restantes &= ~linhas
+            regra[linhas] = len(parametros['fator'])
+            caso_linha[linhas] = indice
+            parametros['fator'].append(fator)
+            parametros['subtrair'].append(subtrair)
+            parametros['piso'].append(piso)
+            parametros['coeficiente'].append(config.get(caso['coeficiente'], 0))
+            parametros['coeficiente_parcela'].append(config.get('coeficiente_parcela', 1.0))
+            parametros['comissao'].append(config.get('comissao', 0) / 100)
+
+        if config.get('banco') not in bancos:
+            bancos.append(config.get('banco'))
+        resultado['banco'][mask] = bancos.index(config.get('banco'))
+        resultado['prazo'][mask] = config.get('parcelas')
+        resultado['tratado'][mask] = True
+
+    resultado['valor_liberado'], resultado['valor_parcela'], resultado['comissao'] = calcular_valores(
+        [caso['margem'] for caso in casos],
+        [caso['valor_zero_se'] for caso in casos],
+        caso_linha,
+        regra,
+        {nome: np.array(valores, dtype=float) for nome, valores in parametros.items()},
+        zerar=zerar,
+        parcela_pela_margem=(produto == 'emprestimo'),
+        vazio=vazio,
+    )
+    return resultado
+
+def _preparar_produto(base: pd.DataFrame, plano: dict, matriculas_zerar: dict, produto: str):
+    """Casos de margem e máscara de matrículas a zerar do produto, calculados uma vez por execução."""
+    casos = preparar_casos(base, plano, produto)
+    zerar = None
+    if len(matriculas_zerar.get(produto, [])):
+        zerar = mascara_matriculas(base['Matricula'], matriculas_zerar[produto])
+    return casos, zerar
+
+def _calcular_produto_unico(base: pd.DataFrame, params: dict, configs_banco: list, plano: dict,
+                            matriculas_zerar: dict, produto: str) -> pd.DataFrame:
+    """Calcula um único produto e mantém as linhas tratadas que atingem a comissão mínima."""
+    if not configs_banco:
+        return base
+    casos, zerar = _preparar_produto(base, plano, matriculas_zerar, produto)
+    bancos = ['']
+    resultado = _calcular_produto(base, casos, zerar, configs_banco, produto, bancos)
+
+    manter = resultado['comissao'] >= params.get('comissao_minima', 0)
+    return base.loc[manter].assign(**{
+        f'valor_liberado_{produto}': resultado['valor_liberado'][manter],
+        f'valor_parcela_{produto}': resultado['valor_parcela'][manter],
+        f'comissao_{produto}': resultado['comissao'][manter],
+        f'banco_{produto}': pd.Categorical.from_codes(resultado['banco'][manter] - 1, categories=bancos[1:]),
+        f'prazo_{produto}': resultado['prazo'][manter],
+    })
+
+def _selecionar_base(base: pd.DataFrame, params: dict) -> tuple:
+    """
+    Etapas do convênio e limite de margem da campanha, sobre a base inteira.
+    Retorna a base selecionada, o plano de regras e as matrículas a zerar por produto.
+    """
+    tipo_campanha = params['tipo_campanha']
+    plano = compilar_regras(params['convenio'], tipo_campanha)
+    base, matriculas_zerar = aplicar_etapas(base, plano)
+    if tipo_campanha == 'Novo':
+        base = base.loc[base['MG_Emprestimo_Disponivel'] >= params.get('margem_limite', 0)]
+    else:
+        base = base.loc[base['MG_Emprestimo_Disponivel'] < params.get('margem_limite', 999999)]
+    if tipo_campanha == 'Benefício':
+        base = base.sort_values(by='MG_Beneficio_Saque_Disponivel', ascending=False)
+    return base, plano, matriculas_zerar
+
+def _calcular_campanha(base: pd.DataFrame, params: dict, configs_banco: list, plano: dict,
+                       matriculas_zerar: dict) -> pd.DataFrame:
+    """Cálculo linha a linha da campanha sobre a base já selecionada."""
+    tipo_campanha = params['tipo_campanha']
+    if tipo_campanha == 'Benefício & Cartão':
+        return _calcular_beneficio_e_cartao(base, params, configs_banco, plano, matriculas_zerar)
+    return _calcular_produto_unico(base, params, configs_banco, plano, matriculas_zerar,
+                                   _PRODUTOS_CAMPANHA[tipo_campanha][0])
+
+def _calcular_beneficio_e_cartao(base: pd.DataFrame, params: dict, configs_banco: list, plano: dict,
+                                 matriculas_zerar: dict) -> pd.DataFrame:
+    """
+    Lógica de cálculo para a campanha 'Benefício & Cartão', com todas as regras de negócio.
+    O filtro de comissão é aplicado antes de alocar as colunas de saída,
+    que só são criadas para as linhas sobreviventes (banco categórico, prazo int16).
+    """
+    produtos = {'Benefício': 'beneficio', 'Consignado': 'cartao'}
+    bancos = ['']
+    resultados = {}
+    for escolhido, sufixo in produtos.items():
+        casos, zerar = _preparar_produto(base, plano, matriculas_zerar, sufixo)
+        configs_produto = [config for config in configs_banco if config.get('cartao_escolhido') == escolhido]
+        resultados[sufixo] = _calcular_produto(base, casos, zerar, configs_produto, sufixo, bancos, vazio=0.0)
+
+    comissao_total = np.round(resultados['beneficio']['comissao'] + resultados['cartao']['comissao'], 2)
+    manter = comissao_total >= params.get('comissao_minima', 0)
+
+    colunas = {}
+    for sufixo, resultado in resultados.items():
+        colunas[f'valor_liberado_{sufixo}'] = resultado['valor_liberado'][manter]
+        colunas[f'comissao_{sufixo}'] = resultado['comissao'][manter]
+        colunas[f'valor_parcela_{sufixo}'] = resultado['valor_parcela'][manter]
+        colunas[f'banco_{sufixo}'] = pd.Categorical.from_codes(resultado['banco'][manter], categories=bancos)
+        colunas[f'prazo_{sufixo}'] = resultado['prazo'][manter].astype(np.int16)
+    colunas['comissao_total'] = comissao_total[manter]
+    return base.loc[manter].assign(**colunas)
+
+def data_campanha() -> str:
+    """Data usada no nome da campanha (única entrada não determinística da saída)."""
+    return datetime.today().strftime('%d%m%Y')
 
 def _finalizar_base(df: pd.DataFrame, params: dict) -> pd.DataFrame:
     """Aplica formatação final, adiciona colunas, nome de campanha e limpa o DF."""
@@ -292,54 +264,90 @@ def _finalizar_base(df: pd.DataFrame, params: dict) -> pd.DataFrame:
     base = base[colunas_presentes]
     base.rename(columns=MAPEAMENTO_COLUNAS_FINAL, inplace=True)
     
-    data_hoje = datetime.today().strftime('%d%m%Y')
+    data_hoje = data_campanha()
     campanha_map = {'Novo': 'novo', 'Benefício': 'benef', 'Cartão': 'cartao', 'Benefício & Cartão': 'benef&cartao'}
     tipo_campanha_str = campanha_map.get(params['tipo_campanha'], 'campanha')
     convenio = params.get('convenio', 'geral')
     equipe = params.get('equipe', 'outbound')
     
-    base['Campanha'] = f"{convenio}_{data_hoje}_{tipo_campanha_str}_{equipe}"
-    
-    convai_percent = params.get('convai_percent', 0)
-    if convai_percent > 0 and len(base) > 0:
-        n_convai = int((convai_percent / 100) * len(base))
-        if n_convai > 0:
-            indices_convai = base.sample(n=n_convai, random_state=42).index
-            base.loc[indices_convai, 'Campanha'] = f"{convenio}_{data_hoje}_{tipo_campanha_str}_convai"
+    # Divisão semeada entre equipe principal, ConvAI e equipes adicionais
+    equipes = atribuir_equipes(
+        len(base), equipe,
+        params.get('convai_percent', 0),
+        params.get('equipes_adicionais')
+    )
+    base['Campanha'] = f"{convenio}_{data_hoje}_{tipo_campanha_str}_" + pd.Series(equipes, index=base.index, dtype=object)
             
     colunas_para_remover = ['tratado', 'tratado_beneficio', 'tratado_cartao', 'comissao_total', 'margem_beneficio_usado', 'margem_cartao_usado']
     base.drop(columns=[col for col in colunas_para_remover if col in base.columns], inplace=True, errors='ignore')
             
     return base
 
+def _selecionar_melhores(base: pd.DataFrame, coluna_ordem: str, colunas_banco: list, params: dict) -> pd.DataFrame:
+    """
+    Modo com limite de capacidade: mantém a melhor linha de cada CPF e seleciona os N melhores
+    clientes (no total e/ou por grupo), sem ordenar a base inteira. Só o resultado é ordenado.
+    """
+    valores = base[coluna_ordem]
+
+    # Melhor linha por CPF: linhas iguais ao máximo do grupo (hash), uma por CPF
+    if 'CPF' in base.columns:
+        maximo_cpf = valores.groupby(base['CPF'], sort=False, dropna=False).transform('max')
+        base = base.loc[valores == maximo_cpf].drop_duplicates(subset=['CPF'])
+        valores = base[coluna_ordem]
+
+    # Cota por grupo (Lotação ou banco)
+    cota_por = params.get('cota_por')
+    cota_por_grupo = params.get('cota_por_grupo', 0)
+    if cota_por and cota_por_grupo:
+        if cota_por == 'Banco':
+            grupo = base[colunas_banco[0]].astype(str)
+            for coluna_banco in colunas_banco[1:]:
+                grupo = grupo.where(grupo != '', base[coluna_banco].astype(str))
+        else:
+            grupo = base[cota_por] if cota_por in base.columns else None
+        if grupo is not None:
+            posicao = valores.groupby(grupo, sort=False, dropna=False).rank(method='first', ascending=False)
+            base = base.loc[posicao <= cota_por_grupo]
+            valores = base[coluna_ordem]
+
+    # Seleção parcial dos N melhores no total
+    limite = params.get('limite_clientes', 0)
+    if limite and len(base) > limite:
+        base = base.loc[valores.nlargest(limite, keep='first').index]
+
+    return base.sort_values(by=coluna_ordem, ascending=False)
+
+
+def _ordenar_e_finalizar(base_calculada: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """Ordena (ou seleciona os melhores, no modo com limite) e finaliza a base calculada."""
+    if base_calculada.empty:
+        return pd.DataFrame()
+
+    coluna_ordem, colunas_banco = _ORDEM_CAMPANHA[params['tipo_campanha']]
+    if params.get('limite_clientes') or params.get('cota_por'):
+        base_calculada = _selecionar_melhores(base_calculada, coluna_ordem, colunas_banco, params)
+    else:
+        base_calculada = base_calculada.sort_values(by=coluna_ordem, ascending=False)
+
+    return _finalizar_base(base_calculada, params)
+
+
 def aplicar_filtros(df: pd.DataFrame, params: dict, configs_banco: list) -> pd.DataFrame:
     """
     Função principal que orquestra todo o processo de filtragem.
     """
+    if params.get('tipo_campanha') not in _ORDEM_CAMPANHA:
+        return pd.DataFrame()
+
     base_pre_processada = _preprocessar_base(df, params)
-    
-    base_calculada = pd.DataFrame()
-    tipo_campanha = params.get('tipo_campanha')
+    base_pre_processada = _remover_suprimidos(base_pre_processada, params)
 
-    if tipo_campanha == 'Novo':
-        base_calculada = _calcular_novo(base_pre_processada, params, configs_banco)
-        base_calculada = base_calculada.sort_values(by='valor_liberado_emprestimo', ascending=False)
-    elif tipo_campanha == 'Cartão':
-        base_calculada = _calcular_cartao(base_pre_processada, params, configs_banco)
-        base_calculada = base_calculada.sort_values(by='valor_liberado_cartao', ascending=False)
-    elif tipo_campanha == 'Benefício':
-        base_calculada = _calcular_beneficio(base_pre_processada, params, configs_banco)
-        base_calculada = base_calculada.sort_values(by='valor_liberado_beneficio', ascending=False)
-    elif tipo_campanha == 'Benefício & Cartão':
-        base_calculada = _calcular_beneficio_e_cartao(base_pre_processada, params, configs_banco)
-        base_calculada = base_calculada.sort_values(by='comissao_total', ascending=False)
+    base_selecionada, plano, matriculas_zerar = _selecionar_base(base_pre_processada, params)
+    base_calculada = _calcular_campanha(base_selecionada, params, configs_banco, plano, matriculas_zerar)
 
-    if base_calculada.empty:
-        return pd.DataFrame()
+    return _ordenar_e_finalizar(base_calculada, params)
 
-    base_final = _finalizar_base(base_calculada, params)
-    
-    return base_final
 
 #============================================================================
 
@@ -417,7 +425,8 @@ def aplicar_filtro_simulacoes(df: pd.DataFrame, params: dict) -> pd.DataFrame:
             lambda x: x.title() if isinstance(x, str) else x
         )
 
-    # Remove valores inválidos
+    # Remove CPFs suprimidos e valores inválidos
+    base = _remover_suprimidos(base, params)
     base = base.loc[base['valor_liberado_beneficio'].fillna(0) > 0]
     if 'MG_Beneficio_Saque_Disponivel' in base.columns:
         base = base.loc[
@@ -0,0 +1,133 @@
+# leitor_csv.py
+"""
+Leitura de CSVs com o motor CSV do Arrow.
+
+Os arquivos são lidos em paralelo num pool de threads (o Arrow libera o GIL),
+diretamente sobre o buffer do arquivo, sem cópias. Separador e codificação são
+detectados num pequeno prefixo, e a junção dos arquivos é feita em nível Arrow.
+"""
+
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Tamanho do prefixo usado para detectar separador, codificação e cabeçalho
+TAMANHO_PREFIXO = 64 * 1024
+
+# Blocos maiores tornam a inferência de tipos do Arrow mais próxima da do pandas
+TAMANHO_BLOCO = 16 * 1024 * 1024
+
+MAX_THREADS = 8
+
+
+def _buffer_arquivo(arquivo) -> pa.Buffer:
+    """Buffer Arrow sobre o conteúdo do arquivo, sem copiar os bytes quando possível."""
+    if isinstance(arquivo, pa.Buffer):
+        return arquivo
+    if isinstance(arquivo, (str, os.PathLike)):
+        # Caminho no servidor: o arquivo é mapeado em memória e lido no lugar
+        return pa.memory_map(os.fspath(arquivo), 'r').read_buffer()
+    if hasattr(arquivo, 'getbuffer'):
+        return pa.py_buffer(arquivo.getbuffer())
+    arquivo.seek(0)
+    return pa.py_buffer(arquivo.read())
+
+
+def detectar_formato(prefixo: bytes, encoding_padrao: str = 'utf-8') -> Tuple[str, str, List[str]]:
+    """
+    Detecta separador (vírgula ou ponto e vírgula), codificação e cabeçalho a partir do prefixo.
+    Um prefixo só com ASCII não decide a codificação; nesse caso usa `encoding_padrao`.
+    """
+    try:
+        texto = prefixo.decode('utf-8')
+        encoding = 'utf-8' if not prefixo.isascii() else encoding_padrao
+    except UnicodeDecodeError as erro:
+        # O prefixo pode terminar no meio de um caractere multibyte
+        if erro.start >= len(prefixo) - 3:
+            texto = prefixo[:erro.start].decode('utf-8')
+            encoding = 'utf-8'
+        else:
+            texto = prefixo.decode('latin1')
+            encoding = 'latin1'
+
+    # O Arrow descarta o BOM do UTF-8; o cabeçalho detectado também não pode tê-lo
+    texto = texto.removeprefix('\ufeff')
+    primeira_linha = texto.splitlines()[0] if texto else ''
+    sep = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+    cabecalho = next(csv.reader(io.StringIO(primeira_linha), delimiter=sep), [])
+    return sep, encoding, cabecalho
+
+
+def ler_buffer(buffer: pa.Buffer, colunas: Optional[List[str]] = None,
+               todas_texto: bool = False, encoding_padrao: str = 'utf-8') -> pa.Table:
+    """
+    Lê um CSV a partir de um buffer Arrow.
+    `colunas` projeta a leitura (colunas ausentes no arquivo são ignoradas) e
+    `todas_texto` lê todas as colunas como texto, como `dtype=str` no pandas.
+    """
+    sep, encoding, cabecalho = detectar_formato(buffer[:TAMANHO_PREFIXO].to_pybytes(), encoding_padrao)
+
+    selecionadas = set(colunas) if colunas else None
+    include_columns = [c for c in cabecalho if c in selecionadas] if selecionadas else None
+    column_types = {c: pa.string() for c in (include_columns or cabecalho)} if todas_texto else None
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=include_columns,
+        column_types=column_types,
+        strings_can_be_null=True,
+    )
+    parse_options = pa_csv.ParseOptions(delimiter=sep)
+
+    def _ler(encoding_leitura: str) -> pa.Table:
+        read_options = pa_csv.ReadOptions(block_size=TAMANHO_BLOCO, encoding=encoding_leitura)
+        return pa_csv.read_csv(pa.BufferReader(buffer), read_options=read_options,
+                               parse_options=parse_options, convert_options=convert_options)
+
+    try:
+        return _ler(encoding)
+    except pa.ArrowInvalid as erro:
+        mensagem = str(erro)
+        # Bytes inválidos em UTF-8 depois do prefixo: relê como latin1
+        if encoding == 'utf-8' and 'UTF8' in mensagem.upper().replace('-', ''):
+            return _ler('latin1')
+        # Tipo inferido no primeiro bloco não vale para o resto do arquivo: usa o motor C do pandas
+        if 'conversion error' in mensagem:
+            df = pd.read_csv(pa.BufferReader(buffer), sep=sep, encoding=encoding, low_memory=False,
+                             usecols=include_columns, dtype=str if todas_texto else None)
+            return pa.Table.from_pandas(df, preserve_index=False)
+        raise
+
+
+def ler_arquivos(arquivos: list, colunas: Optional[List[str]] = None, todas_texto: bool = False,
+                 encoding_padrao: str = 'utf-8') -> Tuple[List[Tuple[str, pa.Table]], List[Tuple[str, Exception]]]:
+    """
+    Lê vários arquivos em paralelo.
+    Retorna as tabelas lidas (com o nome do arquivo, na ordem de entrada) e os erros por arquivo.
+    """
+    def _tarefa(arquivo):
+        return ler_buffer(_buffer_arquivo(arquivo), colunas, todas_texto, encoding_padrao)
+
+    tabelas, erros = [], []
+    with ThreadPoolExecutor(max_workers=min(MAX_THREADS, max(len(arquivos), 1))) as executor:
+        futuros = [(getattr(arquivo, 'name', os.path.basename(str(arquivo))), executor.submit(_tarefa, arquivo)) for arquivo in arquivos]
+        for nome, futuro in futuros:
+            try:
+                tabelas.append((nome, futuro.result()))
+            except Exception as e:
+                erros.append((nome, e))
+    return tabelas, erros
+
+
+def concatenar(tabelas: List[pa.Table]) -> pd.DataFrame:
+    """Junta as tabelas em nível Arrow e converte uma única vez para pandas."""
+    try:
+        tabela = pa.concat_tables(tabelas, promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Tipos incompatíveis entre arquivos: deixa o pandas resolver como objeto
+        return pd.concat([t.to_pandas() for t in tabelas], ignore_index=True)
+    return tabela.to_pandas()
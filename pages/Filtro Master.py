@@ -1,12 +1,8 @@
 # pages/2_Filtro_Simulacoes.py
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 
-# Importa as funções necessárias dos nossos módulos
-from data_handler import carregar_arquivos_simulacoes, converter_df_para_csv
-from ui_components import exibir_sidebar_simulacoes
-from filters import aplicar_filtro_simulacoes
+from arquivos_servidor import diretorio_configurado, selecionar_arquivos
 
 # --- 1. Configuração da Página ---
 st.set_page_config(page_title="Processador de Simulações", layout="wide")
@@ -17,20 +13,40 @@ st.info(
 )
 
 # --- 2. Interface do Usuário ---
-params = exibir_sidebar_simulacoes()
-
 st.header("📂 Upload de Arquivos")
-uploaded_files = st.file_uploader(
-    "Selecione os arquivos de simulação para processar",
-    type="csv",
-    accept_multiple_files=True,
-    key="uploader_simulacoes"
-)
+# Arquivos grandes podem ser lidos direto de uma pasta do servidor, sem upload
+origem_arquivos = "Upload"
+if diretorio_configurado():
+    origem_arquivos = st.radio(
+        "Origem dos arquivos:", ["Upload", "Pasta do servidor"], horizontal=True, key="origem_simulacoes"
+    )
+if origem_arquivos == "Pasta do servidor":
+    uploaded_files = selecionar_arquivos("simulacoes", local=st)
+else:
+    uploaded_files = st.file_uploader(
+        "Selecione os arquivos de simulação para processar",
+        type="csv",
+        accept_multiple_files=True,
+        key="uploader_simulacoes"
+    )
 
 # --- 3. Lógica Principal ---
 if uploaded_files:
+    # Os módulos de dados (pandas, Arrow, supressão) só são carregados quando há arquivos;
+    # a primeira renderização da página depende só do Streamlit.
+    import pandas as pd
+    from data_handler import carregar_dataset, carregar_arquivos_simulacoes, colunas_necessarias_simulacoes, converter_df_para_csv
+    from ui_components import exibir_sidebar_simulacoes, exibir_resultado_paginado
+
+    params = exibir_sidebar_simulacoes()
+
     # Carrega os dados usando a função específica para este tipo de arquivo
-    base_bruta = carregar_arquivos_simulacoes(uploaded_files)
+    chave_dataset, base_bruta = carregar_dataset(
+        uploaded_files,
+        colunas_necessarias_simulacoes(),
+        carregador=carregar_arquivos_simulacoes,
+        chave_sessao='dataset_chave_simulacoes'
+    )
 
     if not base_bruta.empty:
         st.write("Amostra dos dados carregados:")
@@ -38,29 +54,48 @@ if uploaded_files:
 
         if st.button("🚀 Processar Arquivos e Gerar Campanha", type="primary", use_container_width=True):
             with st.spinner("Extraindo e processando simulações..."):
+                # Os filtros só são importados quando o processamento é pedido
+                from filters import aplicar_filtro_simulacoes
+
                 # Aplica o filtro específico para simulações
                 base_final = aplicar_filtro_simulacoes(base_bruta, params)
-
+                csv, nome_arquivo = None, None
                 if not base_final.empty:
-                    st.success("Arquivos processados com sucesso!")
-                    st.subheader("📊 Resultado Final")
-                    st.dataframe(base_final)
-                    st.metric("Total de registros na campanha final", f"{len(base_final)}")
-
-                    # Download do resultado
                     csv = converter_df_para_csv(base_final)
                     nome_convenio = base_final["Convenio"].iloc[0] if pd.notna(base_final["Convenio"].iloc[0]) else "GERAL"
                     data_hoje = datetime.today().strftime('%d%m%Y')
-                    
-                    st.download_button(
-                        label="📥 Baixar Resultado Final em CSV",
-                        data=csv,
-                        file_name=f'{nome_convenio}_BENEFICIO_SIMULACAO_{params["equipe"].upper()}_{data_hoje}.csv',
-                        mime='text/csv',
-                        use_container_width=True
-                    )
-                else:
-                    st.warning("O processamento não resultou em dados válidos. Verifique o conteúdo dos arquivos e os filtros.")
+                    nome_arquivo = f'{nome_convenio}_BENEFICIO_SIMULACAO_{params["equipe"].upper()}_{data_hoje}.csv'
+                # O resultado fica na sessão para que a paginação não exija reprocessar
+                st.session_state.resultado_simulacoes = {
+                    "base": base_final,
+                    "csv": csv,
+                    "nome_arquivo": nome_arquivo,
+                    "origem": (chave_dataset, params),
+                }
+
+        resultado = st.session_state.get("resultado_simulacoes")
+        if resultado is not None and resultado["origem"] != (chave_dataset, params):
+            # Arquivos ou parâmetros mudaram desde o processamento: o resultado não vale mais
+            st.session_state.pop("resultado_simulacoes", None)
+            resultado = None
+        if resultado is not None:
+            base_final = resultado["base"]
+            if not base_final.empty:
+                st.success("Arquivos processados com sucesso!")
+                st.subheader("📊 Resultado Final")
+                st.metric("Total de registros na campanha final", f"{len(base_final)}")
+                exibir_resultado_paginado(base_final, "simulacoes")
+
+                # Download do resultado, com o nome definido no processamento
+                st.download_button(
+                    label="📥 Baixar Resultado Final em CSV",
+                    data=resultado["csv"],
+                    file_name=resultado["nome_arquivo"],
+                    mime='text/csv',
+                    use_container_width=True
+                )
+            else:
+                st.warning("O processamento não resultou em dados válidos. Verifique o conteúdo dos arquivos e os filtros.")
     else:
         st.error("Não foi possível carregar os dados dos arquivos. Verifique se não estão corrompidos.")
 else:
@@ -0,0 +1,96 @@
+# particionamento.py
+"""
+Particionamento da campanha final em arquivos (equipes, ConvAI, tomadores, banco).
+
+A divisão entre equipes é feita com uma única permutação semeada, e cada linha
+recebe o código da sua partição numa passada vetorizada por dimensão. Depois,
+cada partição é escrita uma única vez a partir das posições agrupadas.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SEMENTE_PADRAO = 42
+
+# Dimensões disponíveis para dividir os arquivos (rótulo na interface -> dimensão)
+DIMENSOES_PARTICAO = {
+    'Equipe': 'equipe',
+    'Tomador': 'tomador',
+    'Banco': 'banco',
+}
+
+
+def atribuir_equipes(n: int, equipe_principal: str, convai_percent: float = 0,
+                     equipes_adicionais: Optional[Dict[str, float]] = None,
+                     semente: int = SEMENTE_PADRAO) -> np.ndarray:
+    """
+    Distribui `n` linhas entre a equipe principal, a ConvAI e outras equipes, por percentual.
+    A ConvAI recebe as primeiras posições de uma permutação semeada (o mesmo sorteio de
+    `base.sample(random_state=semente)`), as demais equipes os blocos seguintes e o que
+    sobrar fica com a equipe principal.
+    """
+    equipes = np.full(n, equipe_principal, dtype=object)
+    alocacoes = [('convai', convai_percent)] + list((equipes_adicionais or {}).items())
+    alocacoes = [(nome, percentual) for nome, percentual in alocacoes if percentual and percentual > 0]
+    if n == 0 or not alocacoes:
+        return equipes
+
+    ordem = np.random.RandomState(semente).permutation(n)
+    inicio = 0
+    for nome, percentual in alocacoes:
+        quantidade = min(int((percentual / 100) * n), n - inicio)
+        equipes[ordem[inicio:inicio + quantidade]] = nome
+        inicio += quantidade
+    return equipes
+
+
+def coluna_banco(base: pd.DataFrame) -> pd.Series:
+    """Banco da linha: o primeiro banco preenchido entre os produtos."""
+    banco = pd.Series('', index=base.index, dtype=object)
+    for coluna in ['banco_emprestimo', 'banco_beneficio', 'banco_cartao']:
+        if coluna in base.columns:
+            valores = base[coluna].astype(object).where(base[coluna].notna(), '').astype(str)
+            banco = banco.where(banco != '', valores)
+    return banco.replace('', 'sem_banco')
+
+
+def _rotulos_dimensao(base: pd.DataFrame, dimensao: str) -> pd.Series:
+    if dimensao == 'equipe':
+        # Campanha = {convenio}_{data}_{tipo}_{equipe}; o nome da equipe pode conter '_'
+        codigos, valores = pd.factorize(base['Campanha'])
+        equipes = pd.Series(valores, dtype=object).str.split('_', n=3).str[-1].to_numpy()
+        return pd.Series(equipes[codigos], index=base.index)
+    if dimensao == 'tomador':
+        nao_tomador = base['Mg_Emprestimo_Total'] == base['Mg_Emprestimo_Disponivel']
+        return pd.Series(np.where(nao_tomador, 'nao_tomadores', 'tomadores'), index=base.index)
+    if dimensao == 'banco':
+        return coluna_banco(base)
+    raise ValueError(f"Dimensão de partição desconhecida: {dimensao}")
+
+
+def atribuir_particoes(base: pd.DataFrame, dimensoes: List[str]) -> pd.Series:
+    """Rótulo da partição de cada linha (combinação das dimensões, separadas por '_')."""
+    codigo = np.zeros(len(base), dtype=np.int64)
+    rotulos = [[]]
+    for dimensao in dimensoes:
+        codigos, valores = pd.factorize(_rotulos_dimensao(base, dimensao), sort=True)
+        codigo = codigo * len(valores) + codigos
+        rotulos = [anterior + [str(valor)] for anterior in rotulos for valor in valores]
+    nomes = np.array(['_'.join(partes) for partes in rotulos], dtype=object)
+    return pd.Series(nomes[codigo], index=base.index)
+
+
+def escrever_particoes(base: pd.DataFrame, dimensoes: List[str],
+                       converter: Callable[[pd.DataFrame], bytes]) -> Dict[str, bytes]:
+    """
+    Escreve todas as partições de uma vez: as posições de cada partição são agrupadas numa
+    única passada (hash) e cada linha é serializada apenas no arquivo da sua partição.
+    A ordem das linhas dentro de cada arquivo é a mesma da base.
+    """
+    if not dimensoes or base.empty:
+        return {}
+    particoes = atribuir_particoes(base, dimensoes)
+    posicoes = particoes.reset_index(drop=True).groupby(particoes.to_numpy(), sort=True).indices
+    return {nome: converter(base.take(indices)) for nome, indices in posicoes.items()}
@@ -0,0 +1,67 @@
+# perfil_dataset.py
+"""
+Perfil do dataset carregado, calculado uma única vez por base.
+
+Guarda os valores distintos (com contagens) das colunas usadas nos widgets,
+a taxa de nulos de cada coluna e estatísticas das colunas de margem (MG_*),
+para que a interface não precise varrer a base a cada interação.
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+from config import COLUNAS_CONDICAO
+
+QUANTIS = [0.25, 0.5, 0.75]
+
+
+def calcular_perfil(df: pd.DataFrame) -> Dict:
+    """Calcula o perfil completo do DataFrame."""
+    colunas_categoricas = [c for c in dict.fromkeys(['Lotacao', 'Vinculo_Servidor'] + COLUNAS_CONDICAO) if c in df.columns]
+
+    valores = {}
+    for coluna in colunas_categoricas:
+        valores[coluna] = df[coluna].value_counts(dropna=True, sort=False).sort_index()
+
+    margens = {}
+    for coluna in df.columns:
+        if str(coluna).startswith('MG_') and pd.api.types.is_numeric_dtype(df[coluna]):
+            serie = df[coluna].dropna()
+            quantis = serie.quantile(QUANTIS) if not serie.empty else pd.Series(index=QUANTIS, dtype=float)
+            margens[coluna] = {
+                'min': serie.min(),
+                'max': serie.max(),
+                **{f'q{int(q * 100)}': quantis[q] for q in QUANTIS},
+            }
+
+    return {
+        'n_linhas': len(df),
+        'valores': valores,
+        'nulos': (df.isna().mean() if len(df) else pd.Series(0.0, index=df.columns)).to_dict(),
+        'margens': margens,
+    }
+
+
+def opcoes_coluna(perfil: Dict, coluna: str) -> List:
+    """Valores distintos (ordenados) de uma coluna, como em `sorted(df[coluna].dropna().unique())`."""
+    contagens = perfil['valores'].get(coluna)
+    return [] if contagens is None else contagens.index.tolist()
+
+
+def formatar_opcao(perfil: Dict, coluna: str):
+    """Função de formatação para widgets, exibindo a contagem ao lado de cada valor."""
+    contagens = perfil['valores'].get(coluna, pd.Series(dtype='int64'))
+
+    def _formatar(valor) -> str:
+        quantidade = contagens.get(valor)
+        return f"{valor} ({quantidade:,})".replace(',', '.') if quantidade is not None else str(valor)
+
+    return _formatar
+
+
+def resumo_perfil(perfil: Dict) -> pd.DataFrame:
+    """Tabela com taxa de nulos e estatísticas das margens, para exibição."""
+    resumo = pd.DataFrame(perfil['margens']).T
+    nulos = pd.Series(perfil['nulos'], name='% nulos') * 100
+    return resumo.join(nulos.round(2), how='left') if not resumo.empty else nulos.round(2).to_frame()
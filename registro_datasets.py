@@ -0,0 +1,137 @@
+# registro_datasets.py
+"""
+Registro de datasets em memória, compartilhado por todas as sessões do processo.
+
+Cada base carregada é guardada uma única vez, indexada pelo hash do conteúdo.
+As sessões recebem apenas uma referência ao mesmo DataFrame (sem a cópia
+serializada que o `st.cache_data` devolve a cada rerun) e declaram o uso com
+`adquirir`/`liberar`. Bases sem sessões ativas são despejadas (LRU) quando o
+registro passa do limite de memória.
+
+A base registrada nunca é entregue diretamente: cada sessão recebe a sua própria
+cópia rasa (sem copiar os dados). Com o Copy-on-Write do pandas, qualquer escrita
+numa dessas cópias copia antes os dados afetados, então uma sessão não altera a
+base das outras. A carga de um arquivo grande usa uma trava própria da chave e não
+bloqueia o registro para as demais sessões.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from config import LIMITE_REGISTRO_DATASETS_MB
+
+_registro: "OrderedDict[str, Dict]" = OrderedDict()
+_trava = threading.RLock()
+_travas_carga: Dict[str, threading.Lock] = {}
+
+
+def _tamanho(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _vista(entrada: Dict, sessao: Optional[str]) -> pd.DataFrame:
+    """Cópia rasa da base para a sessão (a mesma em todos os reruns da sessão)."""
+    if sessao is None:
+        return entrada['df'].copy(deep=False)
+    vista = entrada['vistas'].get(sessao)
+    if vista is None:
+        vista = entrada['vistas'][sessao] = entrada['df'].copy(deep=False)
+    return vista
+
+
+def obter(chave: str, sessao: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """Retorna a base registrada para a chave (ou None), marcando o uso recente."""
+    with _trava:
+        entrada = _registro.get(chave)
+        if entrada is None:
+            return None
+        _registro.move_to_end(chave)
+        return _vista(entrada, sessao)
+
+
+def obter_ou_carregar(chave: str, carregar: Callable[[], pd.DataFrame], sessao: Optional[str] = None) -> pd.DataFrame:
+    """
+    Retorna a base da chave, carregando-a uma única vez por processo.
+    A carga roda fora da trava do registro, sob uma trava da própria chave: outra sessão
+    que peça a mesma base espera por ela, as demais não são bloqueadas.
+    Bases vazias (falha de leitura) não são registradas, para permitir nova tentativa.
+    """
+    df = obter(chave, sessao)
+    if df is None:
+        with _trava:
+            trava_carga = _travas_carga.setdefault(chave, threading.Lock())
+        with trava_carga:
+            df = obter(chave, sessao)
+            if df is None:
+                carregado = carregar()
+                if carregado.empty:
+                    return carregado
+                tamanho = _tamanho(carregado)
+                with _trava:
+                    _registro[chave] = {'df': carregado, 'bytes': tamanho, 'sessoes': set(), 'vistas': {}}
+                    df = _vista(_registro[chave], sessao)
+        with _trava:
+            _travas_carga.pop(chave, None)
+    with _trava:
+        if sessao is not None:
+            adquirir(chave, sessao)
+        _despejar()
+    return df
+
+
+def adquirir(chave: str, sessao: str) -> None:
+    """Registra que a sessão está usando a base."""
+    with _trava:
+        if chave in _registro:
+            _registro[chave]['sessoes'].add(sessao)
+
+
+def liberar(chave: str, sessao: str) -> None:
+    """Registra que a sessão deixou de usar a base (ela passa a ser candidata ao despejo)."""
+    with _trava:
+        if chave in _registro:
+            _registro[chave]['sessoes'].discard(sessao)
+            _registro[chave]['vistas'].pop(sessao, None)
+
+
+def remover(chave: str) -> None:
+    """Remove explicitamente uma base do registro."""
+    with _trava:
+        _registro.pop(chave, None)
+
+
+def _despejar(sessao_ativa: Optional[Callable[[str], bool]] = None) -> None:
+    """Remove as bases menos usadas e sem sessões até o registro caber no limite."""
+    limite = LIMITE_REGISTRO_DATASETS_MB * 1024 * 1024
+    with _trava:
+        if sessao_ativa is not None:
+            for entrada in _registro.values():
+                entrada['sessoes'] = {s for s in entrada['sessoes'] if sessao_ativa(s)}
+                entrada['vistas'] = {s: v for s, v in entrada['vistas'].items() if s in entrada['sessoes']}
+
+        total = sum(entrada['bytes'] for entrada in _registro.values())
+        for chave in list(_registro):
+            if total <= limite:
+                break
+            entrada = _registro[chave]
+            if not entrada['sessoes']:
+                total -= entrada['bytes']
+                del _registro[chave]
+
+
+def despejar(sessao_ativa: Optional[Callable[[str], bool]] = None) -> None:
+    """Força o despejo, descartando antes as sessões que não estão mais ativas."""
+    _despejar(sessao_ativa)
+
+
+def estatisticas() -> Dict:
+    """Resumo do registro (quantidade de bases, memória ocupada e sessões por base)."""
+    with _trava:
+        return {
+            'bases': len(_registro),
+            'megabytes': round(sum(e['bytes'] for e in _registro.values()) / 1024 / 1024, 1),
+            'sessoes': {chave: len(e['sessoes']) for chave, e in _registro.items()},
+        }
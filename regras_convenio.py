@@ -0,0 +1,122 @@
+# regras_convenio.py
+"""
+Registro declarativo das regras por convênio (ver REGRAS_CONVENIO em config.py).
+
+As expressões de cada convênio/campanha são compiladas uma única vez num plano.
+Na execução, as etapas (filtros, exclusões e matrículas a zerar) e as margens de
+cada caso são avaliadas uma vez sobre a base inteira; o laço das configurações
+de banco só recorta esses resultados.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import REGRAS_CONVENIO, REGRAS_CONVENIO_PADRAO
+
+
+@lru_cache(maxsize=None)
+def _compilar(expressao: str):
+    return compile(expressao, f'<regra: {expressao}>', 'eval')
+
+
+def avaliar(codigo, base: pd.DataFrame):
+    """Avalia uma expressão compilada sobre as colunas da base."""
+    return eval(codigo, {'__builtins__': {}}, {nome: base[nome] for nome in codigo.co_names})
+
+
+@lru_cache(maxsize=None)
+def compilar_regras(convenio: str, tipo_campanha: str) -> Dict:
+    """
+    Plano do convênio para a campanha: as regras padrão da campanha com as do convênio
+    por cima ('etapas' substitui a lista; 'margens' substitui os produtos declarados).
+    """
+    padrao = REGRAS_CONVENIO_PADRAO.get(tipo_campanha, {})
+    especificas = REGRAS_CONVENIO.get(convenio, {}).get(tipo_campanha, {})
+    etapas = especificas.get('etapas', padrao.get('etapas', []))
+    margens = {**padrao.get('margens', {}), **especificas.get('margens', {})}
+
+    plano_etapas = []
+    for etapa in etapas:
+        for tipo in ('filtrar', 'excluir_matriculas', 'zerar_matriculas'):
+            if tipo in etapa:
+                plano_etapas.append((tipo, _compilar(etapa[tipo]), etapa.get('produto')))
+                break
+        else:
+            raise ValueError(f"Etapa de regra desconhecida para '{convenio}/{tipo_campanha}': {etapa}")
+
+    plano_margens = {}
+    for produto, casos in margens.items():
+        plano_margens[produto] = [
+            {
+                'margem': _compilar(caso['margem']),
+                'coeficiente': caso.get('coeficiente', 'coeficiente'),
+                'quando': _compilar(caso['quando']) if caso.get('quando') else None,
+                'config': tuple(caso.get('config', {}).items()),
+                'valor_zero_se': _compilar(caso['valor_zero_se']) if caso.get('valor_zero_se') else None,
+            }
+            for caso in casos
+        ]
+    return {'etapas': plano_etapas, 'margens': plano_margens}
+
+
+def colunas_regras(convenio: str, tipo_campanha: str) -> List[str]:
+    """Colunas referenciadas pelas regras do convênio (usadas na projeção da leitura)."""
+    plano = compilar_regras(convenio, tipo_campanha)
+    codigos = [codigo for _, codigo, _ in plano['etapas']]
+    for casos in plano['margens'].values():
+        for caso in casos:
+            codigos += [c for c in (caso['margem'], caso['quando'], caso['valor_zero_se']) if c is not None]
+    colunas = ['Matricula'] if any(tipo != 'filtrar' for tipo, _, _ in plano['etapas']) else []
+    for codigo in codigos:
+        colunas += codigo.co_names
+    return list(dict.fromkeys(colunas))
+
+
+def mascara_matriculas(matriculas_base: pd.Series, matriculas) -> np.ndarray:
+    """
+    Linhas cuja matrícula está em `matriculas`. Compara como objetos: o `isin` das strings
+    Arrow converte os valores procurados um a um, o que domina o custo com muitas matrículas.
+    """
+    return matriculas_base.astype(object).isin(np.asarray(matriculas, dtype=object)).to_numpy()
+
+
+def aplicar_etapas(base: pd.DataFrame, plano: Dict) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Executa as etapas do plano em ordem.
+    Retorna a base filtrada e, por produto, as matrículas cujo valor liberado deve ser zerado.
+    """
+    matriculas_zerar = {}
+    for tipo, codigo, produto in plano['etapas']:
+        resultado = avaliar(codigo, base)
+        if tipo == 'filtrar':
+            base = base.loc[resultado]
+        elif tipo == 'excluir_matriculas':
+            base = base.loc[~mascara_matriculas(base['Matricula'], base.loc[resultado, 'Matricula'].unique())]
+        else:
+            matriculas = base.loc[resultado, 'Matricula'].unique()
+            if produto in matriculas_zerar:
+                matriculas = pd.unique(np.concatenate([matriculas_zerar[produto], matriculas]))
+            matriculas_zerar[produto] = matriculas
+    return base, matriculas_zerar
+
+
+def preparar_casos(base: pd.DataFrame, plano: Dict, produto: str) -> List[Dict]:
+    """Avalia uma única vez, sobre a base inteira, as margens e condições dos casos do produto."""
+    casos = []
+    for caso in plano['margens'].get(produto, []):
+        casos.append({
+            'margem': np.asarray(avaliar(caso['margem'], base), dtype=float),
+            'coeficiente': caso['coeficiente'],
+            'quando': np.asarray(avaliar(caso['quando'], base), dtype=bool) if caso['quando'] else None,
+            'config': caso['config'],
+            'valor_zero_se': np.asarray(avaliar(caso['valor_zero_se'], base), dtype=bool) if caso['valor_zero_se'] else None,
+        })
+    return casos
+
+
+def caso_aplicavel(caso: Dict, config: dict) -> bool:
+    """Indica se o caso vale para a configuração de banco (conforme as exigências de 'config')."""
+    return all(bool(config.get(chave, False)) == valor for chave, valor in caso['config'])
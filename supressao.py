@@ -0,0 +1,170 @@
+# supressao.py
+"""
+Índice local de CPFs suprimidos (campanhas anteriores, opt-outs e cooldowns por equipe).
+
+Cada lista ingerida vira um lote em disco: um array int64 ordenado e sem repetições,
+descrito no manifesto (tipo, equipe, validade). Para uma equipe, os lotes vigentes
+são combinados num único índice ordenado, gravado em disco e lido por memory map.
+A consulta é uma busca binária vetorizada (`np.searchsorted`) sobre os CPFs ordenados.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import DIRETORIO_SUPRESSAO
+
+_ARQUIVO_MANIFESTO = 'manifesto.json'
+
+_trava = threading.RLock()
+_indices: Dict[str, np.ndarray] = {}
+
+
+def _diretorio() -> Path:
+    diretorio = Path(DIRETORIO_SUPRESSAO)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def normalizar_cpfs(cpfs) -> np.ndarray:
+    """
+    Converte CPFs (com ou sem pontuação) para int64; valores inválidos viram -1.
+    Uma coluna só com dígitos e alguma célula vazia é lida do CSV como float: ela é
+    convertida numericamente (o texto de `12345678901.0` teria um dígito a mais).
+    """
+    serie = pd.Series(cpfs, copy=False)
+    if pd.api.types.is_float_dtype(serie):
+        inteiros = (serie >= 0) & (serie == serie.round())
+        serie = serie.where(inteiros).round().astype('Int64')
+    elif not pd.api.types.is_integer_dtype(serie):
+        serie = pd.to_numeric(serie.astype(str).str.replace(r'\D', '', regex=True), errors='coerce')
+    return serie.fillna(-1).astype('int64').to_numpy()
+
+
+def _ordenar_unicos(valores: np.ndarray) -> np.ndarray:
+    """Ordena e remove repetições (mais rápido que `np.unique` para int64 grandes)."""
+    valores = np.sort(valores)
+    if len(valores) == 0:
+        return valores
+    return valores[np.concatenate(([True], valores[1:] != valores[:-1]))]
+
+
+def _ler_manifesto() -> List[Dict]:
+    caminho = _diretorio() / _ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return []
+    return json.loads(caminho.read_text(encoding='utf-8'))
+
+
+def _gravar_manifesto(lotes: List[Dict]) -> None:
+    caminho = _diretorio() / _ARQUIVO_MANIFESTO
+    temporario = caminho.with_suffix('.tmp')
+    temporario.write_text(json.dumps(lotes, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(temporario, caminho)
+
+
+def _vigente(lote: Dict, hoje: date) -> bool:
+    return not lote.get('validade') or date.fromisoformat(lote['validade']) >= hoje
+
+
+def listar_lotes(incluir_expirados: bool = False) -> List[Dict]:
+    """Lotes registrados no manifesto (por padrão, apenas os vigentes)."""
+    hoje = date.today()
+    with _trava:
+        return [lote for lote in _ler_manifesto() if incluir_expirados or _vigente(lote, hoje)]
+
+
+def ingerir_cpfs(cpfs, nome: str, tipo: str, equipe: Optional[str] = None,
+                 validade: Optional[date] = None) -> Dict:
+    """
+    Ingere uma lista de CPFs como um novo lote.
+    `equipe` restringe o lote a uma equipe (cooldown); `validade` define a data de expiração.
+    """
+    valores = normalizar_cpfs(cpfs)
+    valores = _ordenar_unicos(valores[valores >= 0])
+
+    lote = {
+        'id': uuid.uuid4().hex[:12],
+        'nome': nome,
+        'tipo': tipo,
+        'equipe': equipe or None,
+        'validade': validade.isoformat() if validade else None,
+        'quantidade': int(len(valores)),
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+    with _trava:
+        np.save(_diretorio() / f"lote_{lote['id']}.npy", valores)
+        _gravar_manifesto(_ler_manifesto() + [lote])
+    return lote
+
+
+def remover_lote(id_lote: str) -> None:
+    """Remove um lote do manifesto e do disco."""
+    with _trava:
+        _gravar_manifesto([lote for lote in _ler_manifesto() if lote['id'] != id_lote])
+        (_diretorio() / f"lote_{id_lote}.npy").unlink(missing_ok=True)
+
+
+def limpar_expirados() -> int:
+    """Remove os lotes vencidos e os índices combinados antigos. Retorna quantos lotes saíram."""
+    hoje = date.today()
+    with _trava:
+        expirados = [lote for lote in _ler_manifesto() if not _vigente(lote, hoje)]
+        for lote in expirados:
+            remover_lote(lote['id'])
+        for caminho in _diretorio().glob('indice_*.npy'):
+            caminho.unlink(missing_ok=True)
+        _indices.clear()
+    return len(expirados)
+
+
+def _lotes_aplicaveis(equipe: Optional[str]) -> List[Dict]:
+    return [lote for lote in listar_lotes() if lote['equipe'] is None or lote['equipe'] == equipe]
+
+
+def versao_indice(equipe: Optional[str]) -> str:
+    """Versão do índice da equipe: muda quando lotes aplicáveis entram, saem ou vencem."""
+    ids = sorted(lote['id'] for lote in _lotes_aplicaveis(equipe))
+    return hashlib.blake2b('|'.join(ids).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def carregar_indice(equipe: Optional[str]) -> np.ndarray:
+    """Índice ordenado (memory map) com todos os CPFs suprimidos para a equipe."""
+    versao = versao_indice(equipe)
+    with _trava:
+        if versao in _indices:
+            return _indices[versao]
+
+        caminho = _diretorio() / f"indice_{versao}.npy"
+        if not caminho.exists():
+            lotes = [np.load(_diretorio() / f"lote_{lote['id']}.npy", mmap_mode='r') for lote in _lotes_aplicaveis(equipe)]
+            combinado = _ordenar_unicos(np.concatenate(lotes)) if lotes else np.empty(0, dtype='int64')
+            temporario = caminho.with_name(caminho.stem + '.tmp.npy')
+            np.save(temporario, combinado)
+            os.replace(temporario, caminho)
+
+        _indices[versao] = np.load(caminho, mmap_mode='r')
+        return _indices[versao]
+
+
+def mascara_suprimidos(cpfs, equipe: Optional[str]) -> np.ndarray:
+    """Máscara booleana: True para os CPFs presentes no índice de supressão da equipe."""
+    valores = normalizar_cpfs(cpfs)
+    indice = carregar_indice(equipe)
+    if len(indice) == 0 or len(valores) == 0:
+        return np.zeros(len(valores), dtype=bool)
+    # Consultas ordenadas percorrem o índice em sequência (bem menos faltas de cache/página)
+    ordem = np.argsort(valores)
+    ordenados = valores[ordem]
+    posicoes = np.minimum(np.searchsorted(indice, ordenados), len(indice) - 1)
+    mascara = np.empty(len(valores), dtype=bool)
+    mascara[ordem] = indice[posicoes] == ordenados
+    return mascara
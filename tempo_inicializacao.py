@@ -0,0 +1,144 @@
+# tempo_inicializacao.py
+"""
+Benchmark do tempo de inicialização.
+
+Cada medida roda num processo novo: o tempo de import de cada módulo vem do
+`python -X importtime` (soma dos tempos próprios de todos os módulos carregados
+pelo import) e a primeira renderização de cada página, sem base carregada, é
+feita com o `streamlit.testing`. A renderização também verifica que os módulos
+pesados (pandas, Arrow, Supabase, filtros) não são carregados antes de haver uma
+base; se algum for, o comando termina com erro.
+
+Uso:
+    python tempo_inicializacao.py
+    python tempo_inicializacao.py --repeticoes 5 --relatorio inicializacao.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RAIZ_REPOSITORIO = Path(__file__).resolve().parent
+
+# Dependências externas primeiro, depois os módulos do app
+MODULOS = [
+    'streamlit', 'numpy', 'pandas', 'pyarrow.csv', 'supabase',
+    'config', 'arquivos_servidor', 'leitor_csv', 'supressao',
+    'data_handler', 'ui_components', 'filters', 'cache_resultados',
+]
+PAGINAS = ['Filtro v3.py', 'pages/Filtro Master.py']
+# Módulos que só podem ser carregados quando há uma base para processar
+MODULOS_PESADOS = [
+    'numpy', 'pandas', 'pyarrow', 'supabase',
+    'supressao', 'data_handler', 'ui_components', 'filters', 'cache_resultados',
+]
+
+
+def tempo_import(modulo: str, raiz: Path = RAIZ_REPOSITORIO) -> float:
+    """Tempo (ms) de `import modulo` num processo novo, medido com `-X importtime`."""
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=raiz, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"import {modulo} falhou: {processo.stderr.strip().splitlines()[-1]}")
+    total_us = 0
+    for linha in processo.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linha.startswith('import time:'):
+            continue
+        proprio = linha.split(':', 1)[1].split('|')[0].strip()
+        if proprio.isdigit():
+            total_us += int(proprio)
+    return total_us / 1000
+
+
+def _renderizar(raiz: Path, pagina: str) -> None:
+    """Renderiza a página uma vez (processo filho) e imprime o tempo e os módulos pesados carregados."""
+    sys.path.insert(0, str(raiz))
+    from streamlit.testing.v1 import AppTest
+
+    inicio = time.perf_counter()
+    app = AppTest.from_file(str(raiz / pagina), default_timeout=120)
+    app.run()
+    segundos = time.perf_counter() - inicio
+    print(json.dumps({
+        'ms': segundos * 1000,
+        'erros': [str(erro.value) for erro in app.exception],
+        'pesados': [modulo for modulo in MODULOS_PESADOS if modulo in sys.modules],
+    }))
+
+
+def tempo_renderizacao(pagina: str, raiz: Path = RAIZ_REPOSITORIO) -> Dict:
+    """Primeira renderização da página num processo novo (tempo em ms, erros e módulos pesados carregados)."""
+    processo = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '_renderizar', '--raiz', str(raiz), '--pagina', pagina],
+        cwd=raiz, capture_output=True, text=True, check=True
+    )
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def medir(raiz: Path = RAIZ_REPOSITORIO, repeticoes: int = 3) -> Dict:
+    """Mediana de `repeticoes` medidas de import por módulo e de renderização por página."""
+    modulos = {}
+    for modulo in MODULOS:
+        try:
+            modulos[modulo] = statistics.median(tempo_import(modulo, raiz) for _ in range(repeticoes))
+        except RuntimeError as erro:
+            modulos[modulo] = str(erro)
+
+    paginas = {}
+    for pagina in PAGINAS:
+        medidas = [tempo_renderizacao(pagina, raiz) for _ in range(repeticoes)]
+        paginas[pagina] = {
+            'ms': statistics.median(medida['ms'] for medida in medidas),
+            'erros': medidas[-1]['erros'],
+            'pesados': sorted({modulo for medida in medidas for modulo in medida['pesados']}),
+        }
+    return {'modulos': modulos, 'paginas': paginas}
+
+
+def _imprimir(relatorio: Dict) -> None:
+    print("Import (processo novo):")
+    for modulo, ms in relatorio['modulos'].items():
+        print(f"  {modulo:<20} {ms:>9.1f} ms" if isinstance(ms, float) else f"  {modulo:<20} {ms}")
+    print("Primeira renderização (sem base carregada):")
+    for pagina, medida in relatorio['paginas'].items():
+        situacao = 'ok'
+        if medida['erros']:
+            situacao = f"ERRO: {medida['erros'][0]}"
+        elif medida['pesados']:
+            situacao = f"carregou {', '.join(medida['pesados'])}"
+        print(f"  {pagina:<25} {medida['ms']:>9.1f} ms  {situacao}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--raiz', type=Path, default=RAIZ_REPOSITORIO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--relatorio', type=Path, help='grava o relatório em JSON')
+    comandos = parser.add_subparsers(dest='comando')
+    p_renderizar = comandos.add_parser('_renderizar')
+    p_renderizar.add_argument('--raiz', type=Path, required=True)
+    p_renderizar.add_argument('--pagina', required=True)
+
+    args = parser.parse_args(argv)
+    if args.comando == '_renderizar':
+        _renderizar(args.raiz, args.pagina)
+        return 0
+
+    relatorio = medir(args.raiz, args.repeticoes)
+    _imprimir(relatorio)
+    if args.relatorio:
+        args.relatorio.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    falhas = [medida for medida in relatorio['paginas'].values() if medida['erros'] or medida['pesados']]
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
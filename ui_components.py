@@ -2,20 +2,28 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from config import BANCOS_MAPEAMENTO, COLUNAS_CONDICAO
+from config import BANCOS_MAPEAMENTO, COLUNAS_CONDICAO, TIPOS_SUPRESSAO, TIPOS_CAMPANHA
+from perfil_dataset import calcular_perfil, opcoes_coluna, formatar_opcao
+import supressao
+from particionamento import DIMENSOES_PARTICAO
+from visualizador_resultados import calcular_agregados, obter_pagina
 
-def exibir_sidebar(df: pd.DataFrame, restricoes_db: dict):
+def exibir_sidebar(df: pd.DataFrame, restricoes_db: dict, perfil: dict = None):
     """
     Função principal que organiza e exibe toda a barra lateral.
     Ela chama funções menores para cada seção.
+    As opções dos filtros vêm do perfil do dataset (calculado uma vez por base).
     Retorna um dicionário com todas as configurações.
     """
+    if perfil is None:
+        perfil = calcular_perfil(df)
+
     st.sidebar.title("Configurações da Campanha")
 
     # --- 1. Seleção da Campanha ---
     tipo_campanha = st.sidebar.selectbox(
         "1. Tipo da Campanha:",
-        ['Novo', 'Benefício', 'Cartão', 'Benefício & Cartão'],
+        TIPOS_CAMPANHA,
         key="tipo_campanha_selectbox"
     )
 
@@ -40,36 +48,73 @@ def exibir_sidebar(df: pd.DataFrame, restricoes_db: dict):
         st.write(f"**Convênio Detectado:** {convenio}")
 
         if 'Lotacao' in df.columns:
-            lotacoes_disponiveis = sorted(list(df['Lotacao'].dropna().unique()))
+            lotacoes_disponiveis = opcoes_coluna(perfil, 'Lotacao')
             selecao_lotacao = st.multiselect(
                 "Excluir Lotações:",
                 options=lotacoes_disponiveis,
-                default=restricoes_db.get('lotacao', [])
+                default=restricoes_db.get('lotacao', []),
+                format_func=formatar_opcao(perfil, 'Lotacao')
             )
         else:
             selecao_lotacao = []
 
         if 'Vinculo_Servidor' in df.columns:
-            vinculos_disponiveis = sorted(list(df['Vinculo_Servidor'].dropna().unique()))
+            vinculos_disponiveis = opcoes_coluna(perfil, 'Vinculo_Servidor')
             selecao_vinculos = st.multiselect(
                 "Excluir Vínculos:",
                 options=vinculos_disponiveis,
-                default=restricoes_db.get('vinculo', [])
+                default=restricoes_db.get('vinculo', []),
+                format_func=formatar_opcao(perfil, 'Vinculo_Servidor')
             )
         else:
             selecao_vinculos = []
 
     # --- 4. Configuração de Equipes ---
     with st.sidebar.expander("4. Atribuição de Equipes", expanded=True):
+        lista_equipes = ['outbound', 'csapp', 'csativacao', 'cscdx', 'csport', 'outbound_virada']
         equipes = st.selectbox(
             "Equipe Principal:",
-            ['outbound', 'csapp', 'csativacao', 'cscdx', 'csport', 'outbound_virada'],
+            lista_equipes,
             key="equipe_campanha_selectbox"
         )
         convai_percent = st.slider(
             "Porcentagem para IA (ConvAI):", 0, 100, 0,
             key="convai_slider"
         )
+        outras_equipes = st.multiselect(
+            "Dividir com outras equipes:",
+            [equipe for equipe in lista_equipes if equipe != equipes],
+            key="equipes_adicionais_multiselect"
+        )
+        equipes_adicionais = {
+            equipe: st.slider(f"Porcentagem para {equipe}:", 0, 100, 0, key=f"percentual_{equipe}")
+            for equipe in outras_equipes
+        }
+        if convai_percent + sum(equipes_adicionais.values()) > 100:
+            st.error(
+                f"As porcentagens das equipes somam {convai_percent + sum(equipes_adicionais.values())}%: "
+                "o total não pode passar de 100%."
+            )
+        dividir_por = st.multiselect(
+            "Dividir arquivos por:",
+            list(DIMENSOES_PARTICAO.keys()),
+            default=['Tomador'] if tipo_campanha == 'Novo' else [],
+            key=f"dividir_por_{tipo_campanha.lower().replace(' & ', '_')}"
+        )
+        limite_clientes = st.number_input(
+            "Limite de clientes (0 = sem limite):", min_value=0, value=0, step=1000,
+            key="limite_clientes"
+        )
+        cota_por = st.selectbox("Cota por grupo:", ['Sem cota', 'Lotacao', 'Banco'], key="cota_por")
+        cota_por_grupo = 0
+        if cota_por != 'Sem cota':
+            cota_por_grupo = st.number_input(
+                f"Máximo de clientes por {cota_por}:", min_value=1, value=1000, step=100,
+                key="cota_por_grupo"
+            )
+
+    # --- 5. Lista de Supressão ---
+    aplicar_supressao = exibir_supressao(equipes, "campanha")
     
     return {
         "tipo_campanha": tipo_campanha,
@@ -80,13 +125,69 @@ def exibir_sidebar(df: pd.DataFrame, restricoes_db: dict):
         "selecao_vinculos": selecao_vinculos,
         "equipe": equipes,
         "convai_percent": convai_percent,
+        "equipes_adicionais": equipes_adicionais,
+        "dividir_por": [DIMENSOES_PARTICAO[d] for d in dividir_por],
+        "aplicar_supressao": aplicar_supressao,
+        "limite_clientes": limite_clientes,
+        "cota_por": None if cota_por == 'Sem cota' else cota_por,
+        "cota_por_grupo": cota_por_grupo,
         "convenio": convenio
     }
 
 
-def exibir_configuracoes_banco(tipo_campanha: str, convenio: str, df: pd.DataFrame):
+def exibir_supressao(equipe: str, key_prefix: str) -> bool:
+    """
+    Seção da barra lateral para a lista de supressão: ingestão de novas listas de CPFs
+    (campanhas anteriores, opt-outs, cooldowns com validade) e ativação da etapa.
+    Retorna se os CPFs suprimidos devem ser removidos da campanha.
+    """
+    with st.sidebar.expander("5. Lista de Supressão", expanded=False):
+        lotes = supressao.listar_lotes()
+        aplicaveis = [lote for lote in lotes if lote['equipe'] in (None, equipe)]
+        total = sum(lote['quantidade'] for lote in aplicaveis)
+        aplicar = st.checkbox(
+            f"Excluir CPFs suprimidos ({total:,} em {len(aplicaveis)} listas)".replace(',', '.'),
+            value=True,
+            key=f"{key_prefix}_aplicar_supressao"
+        )
+
+        st.write("**Adicionar lista**")
+        arquivo = st.file_uploader("CSV com a coluna CPF", type=['csv'], key=f"{key_prefix}_arquivo_supressao")
+        tipo = st.selectbox("Tipo da lista:", list(TIPOS_SUPRESSAO.keys()), key=f"{key_prefix}_tipo_supressao")
+        apenas_equipe = st.checkbox(f"Apenas para a equipe '{equipe}'", value=TIPOS_SUPRESSAO[tipo] == 'cooldown', key=f"{key_prefix}_equipe_supressao")
+        com_validade = st.checkbox("Com data de expiração", value=TIPOS_SUPRESSAO[tipo] == 'cooldown', key=f"{key_prefix}_com_validade_supressao")
+        validade = st.date_input("Válida até:", key=f"{key_prefix}_validade_supressao") if com_validade else None
+
+        if arquivo is not None and st.button("Adicionar à supressão", key=f"{key_prefix}_botao_supressao"):
+            from data_handler import ler_lista_cpfs
+            try:
+                lote = supressao.ingerir_cpfs(
+                    ler_lista_cpfs(arquivo),
+                    nome=arquivo.name,
+                    tipo=TIPOS_SUPRESSAO[tipo],
+                    equipe=equipe if apenas_equipe else None,
+                    validade=validade
+                )
+                st.success(f"{lote['quantidade']} CPFs adicionados de {arquivo.name}.")
+            except Exception as e:
+                st.error(f"Não foi possível ingerir a lista {arquivo.name}: {e}")
+
+        if lotes:
+            st.write("**Listas vigentes**")
+            st.dataframe(
+                pd.DataFrame(lotes)[['nome', 'tipo', 'equipe', 'validade', 'quantidade']],
+                hide_index=True
+            )
+        if st.button("Remover listas vencidas", key=f"{key_prefix}_limpar_supressao"):
+            st.info(f"{supressao.limpar_expirados()} listas vencidas removidas.")
+    return aplicar
+
+
+def exibir_configuracoes_banco(tipo_campanha: str, convenio: str, df: pd.DataFrame, perfil: dict = None):
     """Cria dinamicamente os campos de configuração para cada banco."""
     st.header("2. Configure os Bancos e Produtos")
+    if perfil is None:
+        perfil = calcular_perfil(df)
     
     quant_bancos = 1
     if tipo_campanha == 'Benefício & Cartão':
@@ -106,8 +207,8 @@ def exibir_configuracoes_banco(tipo_campanha: str, convenio: str, df: pd.DataFra
                 modo_selecao = st.radio("Modo de Seleção:", ["Escolher valor único", "Usar palavras-chave"], key=f"modo_selecao_{i}", horizontal=True, label_visibility="collapsed")
                 config["modo_condicional"] = modo_selecao
                 if modo_selecao == "Escolher valor único":
-                    valores_disponiveis = sorted(list(df[config["coluna_condicional"]].dropna().unique()))
-                    config["valor_condicional"] = st.selectbox(f"Para o valor de '{config['coluna_condicional']}':", options=valores_disponiveis, key=f"valor_{i}")
+                    valores_disponiveis = opcoes_coluna(perfil, config["coluna_condicional"])
+                    config["valor_condicional"] = st.selectbox(f"Para o valor de '{config['coluna_condicional']}':", options=valores_disponiveis, format_func=formatar_opcao(perfil, config["coluna_condicional"]), key=f"valor_{i}")
                 else:
                     config["valor_condicional"] = st.text_input(f"Palavras-chave para '{config['coluna_condicional']}' (separadas por ponto e vírgula):", placeholder="Ex: educacao; saude", key=f"valor_palavra_chave_{i}")
             else:
@@ -175,6 +276,49 @@ def exibir_configuracoes_banco(tipo_campanha: str, convenio: str, df: pd.DataFra
             
     return configuracoes_banco
 
+def exibir_resultado_paginado(df: pd.DataFrame, key_prefix: str):
+    """
+    Exibe o resultado com paginação, ordenação e filtro resolvidos no servidor,
+    além dos agregados por banco, Lotação e campanha. Só a página atual vai ao navegador.
+    """
+    with st.expander("📊 Resumo por Banco, Lotação e Campanha", expanded=False):
+        agregados = calcular_agregados(df)
+        abas = st.tabs(list(agregados.keys()))
+        for aba, tabela in zip(abas, agregados.values()):
+            with aba:
+                st.dataframe(tabela, use_container_width=True)
+
+    col1, col2, col3, col4 = st.columns([2, 1, 2, 2])
+    with col1:
+        ordenar_por = st.selectbox("Ordenar por:", ["(ordem da campanha)"] + list(df.columns), key=f"{key_prefix}_ordenar_por")
+    with col2:
+        crescente = st.toggle("Crescente", value=False, key=f"{key_prefix}_crescente")
+    with col3:
+        filtro_coluna = st.selectbox("Filtrar coluna:", ["(nenhuma)"] + list(df.columns), key=f"{key_prefix}_filtro_coluna")
+    with col4:
+        filtro_texto = st.text_input("Contém:", key=f"{key_prefix}_filtro_texto", disabled=filtro_coluna == "(nenhuma)")
+
+    col_tamanho, col_pagina = st.columns(2)
+    with col_tamanho:
+        tamanho = st.selectbox("Linhas por página:", [25, 50, 100, 500], index=1, key=f"{key_prefix}_tamanho_pagina")
+
+    # Total filtrado (a ordem calculada aqui é memorizada e reaproveitada pela página)
+    argumentos = dict(
+        ordenar_por=None if ordenar_por == "(ordem da campanha)" else ordenar_por,
+        crescente=crescente,
+        filtro_coluna=None if filtro_coluna == "(nenhuma)" else filtro_coluna,
+        filtro_texto=filtro_texto,
+    )
+    _, total = obter_pagina(df, 1, 0, **argumentos)
+    total_paginas = max((total + tamanho - 1) // tamanho, 1)
+    with col_pagina:
+        pagina = st.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, value=1, step=1, key=f"{key_prefix}_pagina")
+
+    pagina_df, _ = obter_pagina(df, pagina, tamanho, **argumentos)
+    st.caption(f"{total} registros após o filtro.")
+    st.dataframe(pagina_df, use_container_width=True, hide_index=True)
+
+
 # ======================================================================
 # Filtro Master
 def exibir_sidebar_simulacoes():
@@ -188,9 +332,11 @@ def exibir_sidebar_simulacoes():
         comissao_minima = st.number_input("Comissão mínima (R$)", value=50.0, step=10.0, min_value=0.0)
 
     filtrar_saldo_devedor = st.sidebar.checkbox("Apenas com saldo devedor > 0", value=False)
+    aplicar_supressao = exibir_supressao(equipe, "simulacao")
 
     return {
         "equipe": equipe,
+        "aplicar_supressao": aplicar_supressao,
         "comissao_banco": comissao_banco,
         "comissao_minima": comissao_minima,
         "filtrar_saldo_devedor": filtrar_saldo_devedor
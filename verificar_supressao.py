@@ -0,0 +1,103 @@
+# verificar_supressao.py
+"""
+Verificação ponta a ponta da lista de supressão com CPFs lidos como número.
+
+Uma coluna CPF só com dígitos e alguma célula vazia é lida do CSV como float,
+tanto pelo Arrow quanto pelo motor C do pandas. A verificação grava uma base
+assim, lê com o mesmo leitor do app, ingere parte dos CPFs (com pontuação, como
+numa lista de opt-out) e confere que a campanha não contém nenhum deles.
+Roda num diretório temporário, sem tocar no índice de supressão local.
+
+Uso:
+    python verificar_supressao.py
+    python verificar_supressao.py --linhas 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+RAIZ_REPOSITORIO = Path(__file__).resolve().parent
+
+
+def _base_cpf_numerico(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Base de campanha com CPFs só com dígitos (alguns com zero à esquerda) e uma célula vazia."""
+    from comparar_motores import gerar_base
+
+    base = gerar_base(n, 'outro', rng)
+    cpfs = 10 ** 9 + rng.choice(10 ** 10, n, replace=False)
+    base['CPF'] = [f'{cpf:011d}' for cpf in cpfs]
+    base.loc[0, 'CPF'] = None
+    return base
+
+
+def _formatar_cpf(cpf: int) -> str:
+    texto = f'{cpf:011d}'
+    return f'{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}'
+
+
+def verificar(n_linhas: int, semente: int) -> List[str]:
+    """Falhas encontradas (lista vazia quando os CPFs suprimidos ficam fora da campanha)."""
+    import filters
+    import supressao
+    from leitor_csv import concatenar, ler_arquivos
+
+    rng = np.random.default_rng(semente)
+    falhas = []
+    caminho = Path('base.csv')
+    _base_cpf_numerico(n_linhas, rng).to_csv(caminho, sep=';', index=False)
+    tabelas, erros = ler_arquivos([caminho])
+    if erros:
+        return [f"erro de leitura: {erros[0][1]}"]
+    df = concatenar([tabela for _, tabela in tabelas])
+    if not pd.api.types.is_float_dtype(df['CPF']):
+        falhas.append(f"o cenário exige CPF lido como float, mas veio {df['CPF'].dtype}")
+
+    presentes = df['CPF'].dropna().round().astype('int64')
+    suprimidos = presentes.sample(frac=0.2, random_state=semente).to_numpy()
+    supressao.ingerir_cpfs([_formatar_cpf(cpf) for cpf in suprimidos], nome='opt-out.csv', tipo='optout')
+    marcados = supressao.mascara_suprimidos(df['CPF'], 'outbound')
+    if marcados.sum() != len(suprimidos):
+        falhas.append(f"mascara_suprimidos marcou {int(marcados.sum())} de {len(suprimidos)} CPFs suprimidos")
+
+    params = {'tipo_campanha': 'Novo', 'convenio': 'outro', 'equipe': 'outbound', 'aplicar_supressao': True}
+    configs = [{'banco': '2', 'coeficiente': 20.0, 'comissao': 5.0, 'parcelas': 84,
+                'coluna_condicional': 'Aplicar a toda a base'}]
+    resultado = filters.aplicar_filtros(df, params, configs)
+    if resultado.empty:
+        falhas.append("a campanha ficou vazia")
+    else:
+        na_campanha = supressao.normalizar_cpfs(resultado['CPF'])
+        vazados = np.intersect1d(na_campanha, suprimidos)
+        if len(vazados):
+            falhas.append(f"{len(vazados)} CPFs suprimidos na campanha, ex.: {vazados[0]:011d}")
+    return falhas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=5000)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(RAIZ_REPOSITORIO))
+    # Diretório de trabalho isolado: o índice de supressão local não é usado nem alterado
+    with tempfile.TemporaryDirectory() as temporario:
+        os.chdir(temporario)
+        falhas = verificar(args.linhas, args.semente)
+        os.chdir(RAIZ_REPOSITORIO)
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    if not falhas:
+        print("OK   CPFs suprimidos fora da campanha (coluna CPF lida como float)")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
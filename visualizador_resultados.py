@@ -0,0 +1,91 @@
+# visualizador_resultados.py
+"""
+Visualização paginada do resultado, mantendo os dados no servidor.
+
+Filtro e ordenação são resolvidos aqui (a ordem de cada combinação é calculada
+uma vez e reaproveitada entre páginas); para o navegador vai apenas a página
+solicitada. Os agregados por banco, Lotação e campanha são calculados uma única
+vez por resultado.
+"""
+
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from particionamento import coluna_banco
+
+COLUNAS_VALOR = [
+    'valor_liberado_emprestimo', 'valor_liberado_beneficio', 'valor_liberado_cartao',
+    'comissao_emprestimo', 'comissao_beneficio', 'comissao_cartao',
+]
+
+# Quantidade de ordenações mantidas por resultado (combinações de filtro e ordenação)
+_TAMANHO_MEMO_ORDENS = 8
+
+_memo: Dict[int, Tuple[weakref.ref, Dict]] = {}
+
+
+def _estado(df: pd.DataFrame) -> Dict:
+    """Memória associada ao DataFrame (descartada junto com ele)."""
+    registro = _memo.get(id(df))
+    if registro is not None and registro[0]() is df:
+        return registro[1]
+    chave_id = id(df)
+    estado = {'ordens': OrderedDict(), 'agregados': None}
+    _memo[chave_id] = (weakref.ref(df, lambda _ref: _memo.pop(chave_id, None)), estado)
+    return estado
+
+
+def calcular_agregados(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Contagens e somas dos valores/comissões por banco, Lotação e campanha (calculado uma vez)."""
+    estado = _estado(df)
+    if estado['agregados'] is not None:
+        return estado['agregados']
+
+    valores = {c: df[c] for c in COLUNAS_VALOR if c in df.columns and pd.api.types.is_numeric_dtype(df[c])}
+    grupos = {'Banco': coluna_banco(df)}
+    for coluna in ['Lotacao', 'Campanha']:
+        if coluna in df.columns:
+            grupos[coluna] = df[coluna].astype(object).fillna('(vazio)')
+
+    agregados = {}
+    for nome, chave in grupos.items():
+        tabela = pd.DataFrame(valores, index=df.index).assign(clientes=1).groupby(chave.to_numpy(), sort=False).sum()
+        agregados[nome] = tabela[['clientes'] + list(valores)].sort_values('clientes', ascending=False).round(2)
+    estado['agregados'] = agregados
+    return agregados
+
+
+def _ordem(df: pd.DataFrame, ordenar_por: Optional[str], crescente: bool,
+           filtro_coluna: Optional[str], filtro_texto: str) -> np.ndarray:
+    """Posições das linhas após filtro e ordenação, memorizadas por combinação."""
+    estado = _estado(df)
+    chave = (ordenar_por, crescente, filtro_coluna, filtro_texto)
+    if chave in estado['ordens']:
+        estado['ordens'].move_to_end(chave)
+        return estado['ordens'][chave]
+
+    posicoes = np.arange(len(df))
+    if filtro_coluna and filtro_texto and filtro_coluna in df.columns:
+        mascara = df[filtro_coluna].astype(str).str.contains(filtro_texto, case=False, regex=False, na=False)
+        posicoes = posicoes[mascara.to_numpy()]
+    if ordenar_por and ordenar_por in df.columns:
+        chaves = df[ordenar_por].iloc[posicoes].reset_index(drop=True)
+        posicoes = posicoes[chaves.sort_values(ascending=crescente, kind='stable').index.to_numpy()]
+
+    estado['ordens'][chave] = posicoes
+    while len(estado['ordens']) > _TAMANHO_MEMO_ORDENS:
+        estado['ordens'].popitem(last=False)
+    return posicoes
+
+
+def obter_pagina(df: pd.DataFrame, pagina: int, tamanho: int, ordenar_por: Optional[str] = None,
+                 crescente: bool = False, filtro_coluna: Optional[str] = None,
+                 filtro_texto: str = '') -> Tuple[pd.DataFrame, int]:
+    """Retorna a página pedida (começando em 1) e o total de linhas após o filtro."""
+    posicoes = _ordem(df, ordenar_por, crescente, filtro_coluna, filtro_texto)
+    inicio = max(pagina - 1, 0) * tamanho
+    return df.iloc[posicoes[inicio:inicio + tamanho]], len(posicoes)